@@ -5,7 +5,7 @@ import time
 from typing import List, Dict, Tuple
 from logging.handlers import RotatingFileHandler
 
-from flask import Flask, render_template, request, session, redirect, abort
+from flask import Flask, render_template, request, session, redirect, abort, g
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 # 导入项目依赖
@@ -15,6 +15,8 @@ from apps.user import user  # 用户模块蓝图
 from apps.admin import admin_bp  # 管理模块蓝图
 from apps.analytics import analytics_bp  # 数据分析模块蓝图
 from apps.clean_history_data import register_cleanup_hook  # 历史数据清理钩子
+from apps.song_catalog import ensure_song_table  # 歌曲信息表
+from apps.tool.Mysql import SQL_STATS  # SQL执行统计
 
 # 导入CORS支持
 from flask_cors import CORS
@@ -335,6 +337,23 @@ def create_app(config_name=None) -> Flask:
         app.logger.error("数据清理钩子注册失败", exc_info=True)
         raise
     
+    # 4.1 创建歌曲信息表（旧版本升级的数据库中没有song表，播放历史、歌单详情会JOIN该表）
+    try:
+        ensure_song_table()
+        app.logger.info("歌曲信息表检查完成")
+    except Exception as e:
+        app.logger.error(f"歌曲信息表创建失败，请手动执行database_schema.sql中的song表定义: {str(e)}")
+
+    # 4.2 注册SQL统计钩子（按请求汇总执行的SQL，检测N+1查询）
+    @app.teardown_request
+    def record_sql_stats(exc):
+        queries = g.pop('sql_queries', None)
+        if not queries:
+            return
+        endpoint = request.endpoint or request.path
+        for key, count in SQL_STATS.record_request(endpoint, queries):
+            app.logger.warning(f"疑似N+1查询: {endpoint} 同一请求执行 {count} 次 | {key[:300]}")
+
     # 5. 添加全局防护扫描中间件
     try:
         @app.before_request
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app, session, render_template
 from werkzeug.security import check_password_hash
 from functools import wraps
-from apps.tool.Mysql import Mysql
+from apps.tool.Mysql import Mysql, SQL_STATS
 import hashlib
 
 # 创建admin蓝图
@@ -615,9 +615,13 @@ def delete_user(target_user_id):
                         'data': None
                     }), 403
             
-            # 逻辑删除用户
-            delete_sql = f"UPDATE user SET deleted = 1 WHERE id = {target_user_id}"
-            result = mysql.sql(delete_sql)
+            # 逻辑删除用户及其所有歌单（同一事务，一次提交）
+            with mysql.transaction():
+                delete_sql = f"UPDATE user SET deleted = 1 WHERE id = {target_user_id}"
+                result = mysql.sql(delete_sql)
+                if isinstance(result, tuple) and result[0] is not None and result[0] > 0:
+                    delete_playlists_sql = f"UPDATE playlist SET deleted = 1 WHERE user_id = {target_user_id}"
+                    mysql.sql(delete_playlists_sql)
             
             # 检查删除用户是否成功
             if not (isinstance(result, tuple) and result[0] is not None and result[0] > 0):
@@ -627,10 +631,6 @@ def delete_user(target_user_id):
                     'data': None
                 }), 500
             
-            # 删除用户的所有歌单
-            delete_playlists_sql = f"UPDATE playlist SET deleted = 1 WHERE user_id = {target_user_id}"
-            mysql.sql(delete_playlists_sql)
-            
             return jsonify({
                 'code': 200,
                 'msg': '删除用户成功',
@@ -1136,17 +1136,16 @@ def delete_playlist(playlist_id):
                 'data': None
             }), 404
             
-            # 逻辑删除歌单
-            mysql.sql(
-                "UPDATE playlist SET deleted = 1 WHERE id = %s",
-                [playlist_id]
-            )
-            
-            # 删除歌单中的所有歌曲关联
-            mysql.sql(
-                "DELETE FROM playlist_song WHERE playlist_id = %s",
-                [playlist_id]
-            )
+            # 逻辑删除歌单并删除歌单中的所有歌曲关联（同一事务，一次提交）
+            with mysql.transaction():
+                mysql.sql(
+                    "UPDATE playlist SET deleted = 1 WHERE id = %s",
+                    [playlist_id]
+                )
+                mysql.sql(
+                    "DELETE FROM playlist_song WHERE playlist_id = %s",
+                    [playlist_id]
+                )
             
             current_app.logger.info(f"管理员删除歌单 {playlist_id} 成功")
             return jsonify({
@@ -1243,3 +1242,20 @@ def update_playlist(playlist_id):
     except Exception as e:
         current_app.logger.error(f"管理员更新歌单信息错误: {str(e)}")
         return jsonify({'code': 500, 'msg': '系统错误，请稍后重试', 'data': None}), 500
+
+
+# 管理员接口：SQL执行统计
+@admin_bp.route('/sql/stats', methods=['GET', 'DELETE'])
+@admin_required
+def sql_stats():
+    """
+    获取SQL执行统计（按指纹、按请求端点汇总，慢查询和N+1查询记录）
+    GET参数: top (返回耗时最多的前N个指纹/端点，默认20)
+    DELETE: 清空统计
+    """
+    if request.method == 'DELETE':
+        SQL_STATS.reset()
+        current_app.logger.info(f"管理员 {session.get('user_id')} 清空了SQL统计")
+        return jsonify({'code': 200, 'msg': '清空SQL统计成功', 'data': None}), 200
+    top = min(max(request.args.get('top', 20, type=int), 1), 200)
+    return jsonify({'code': 200, 'msg': '获取SQL统计成功', 'data': SQL_STATS.stats(top)}), 200
@@ -55,11 +55,10 @@ def clean_play_history_data(days_to_keep=90, max_records_per_user=1000):
             # 2. 为每个用户保留最新记录（参数化查询 + 批量删除）
             logger.info(f"开始清理每个用户超过{max_records_per_user}条的记录...")
             
+            # 流式读取用户ID，用户数再多内存占用也不变
             users_sql = "SELECT DISTINCT user_id FROM play_history"
-            users = db.sql(users_sql)
-            
-            if isinstance(users, list) and users:
-                for user in users:
+            for user_batch in db.select_iter(users_sql, batch_size=SCHEDULER_CONFIG["BATCH_SIZE"]):
+                for user in user_batch:
                     user_id = user.get('user_id')
                     if user_id:
                         # 修复：参数化查询（user_id 和 limit 用占位符）
@@ -134,19 +133,26 @@ def clean_play_history_data(days_to_keep=90, max_records_per_user=1000):
 # -------------------------- Flask 定时任务核心 --------------------------
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor
+import atexit
 
 # 全局调度器实例
 scheduler = None
 
-def start_scheduler():
-    """启动定时任务调度器"""
+def refresh_music_snapshots(app: Flask):
+    """在应用上下文中刷新热门歌单和排行榜快照"""
+    from apps.music import refresh_snapshots
+    with app.app_context():
+        refresh_snapshots()
+
+def start_scheduler(app: Flask = None):
+    """启动定时任务调度器（传入app时同时启动歌单快照刷新任务）"""
     global scheduler
     if scheduler and scheduler.running:
         logger.warning("定时调度器已在运行")
         return
     
-    # 配置单线程执行，避免数据库并发冲突
-    executors = {"default": ThreadPoolExecutor(1)}
+    # 配置单线程执行，避免数据库并发冲突；快照刷新只访问上游，使用独立线程，不被清理任务阻塞
+    executors = {"default": ThreadPoolExecutor(1), "snapshot": ThreadPoolExecutor(1)}
     scheduler = BackgroundScheduler(
         executors=executors,
         timezone="Asia/Shanghai"  # 指定时区，避免错乱
@@ -160,6 +166,23 @@ def start_scheduler():
         hour=SCHEDULER_CONFIG["CRON_HOUR"],
         minute=SCHEDULER_CONFIG["CRON_MINUTE"]
     )
+
+    # 添加快照刷新任务（启动时立即执行一次预热）
+    if app is not None:
+        interval = app.config.get('SNAPSHOT_REFRESH_INTERVAL', 600)
+        scheduler.add_job(
+            id="music_snapshot_refresh",
+            func=refresh_music_snapshots,
+            args=[app],
+            trigger="interval",
+            seconds=interval,
+            # 使用调度器时区的当前时间，naive时间会被当作Asia/Shanghai时间，在其他时区的主机上会错过首次执行
+            next_run_time=datetime.datetime.now(scheduler.timezone),
+            executor="snapshot",
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"歌单快照刷新任务已添加，每{interval}秒刷新一次")
     
     scheduler.start()
     logger.info(f"定时调度器启动成功！每天 {SCHEDULER_CONFIG['CRON_HOUR']}:{SCHEDULER_CONFIG['CRON_MINUTE']:02d} 执行清理")
@@ -175,7 +198,7 @@ def register_cleanup_hook(app: Flask):
     """
     注册 Flask 定时任务（适配 Flask 生命周期）
     - 应用启动时启动调度器
-    - 应用退出时停止调度器
+    - 进程退出时停止调度器
     - 兼容 Flask 1.x/2.x
     """
     # 替代 before_first_request（兼容 Flask 2.0+）
@@ -186,12 +209,10 @@ def register_cleanup_hook(app: Flask):
         nonlocal scheduler_initialized
         if not scheduler_initialized:
             scheduler_initialized = True
-            start_scheduler()
+            start_scheduler(app)
     
-    # 应用退出时停止调度器
-    @app.teardown_appcontext
-    def shutdown_scheduler(exception=None):
-        stop_scheduler()
+    # 进程退出时停止调度器（teardown_appcontext在每个请求结束时都会触发，不能用于停止调度器）
+    atexit.register(stop_scheduler)
 
 if __name__ == "__main__":
     # 直接运行时执行一次清理（测试用）
@@ -1,17 +1,34 @@
+import asyncio
 import json
+import threading
+import time
+import unicodedata
 import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from hashlib import md5
+from http.cookiejar import DefaultCookiePolicy
 from random import randrange
 from typing import Dict, List, Union
 from dataclasses import dataclass
 import requests
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from flask import Blueprint, request, jsonify, redirect, Response, current_app
+from flask import Blueprint, request, jsonify, redirect, Response, current_app, stream_with_context
 from config import current_config
+from apps.tool.Cache import TTLCache, SingleFlight, Snapshot
+from apps.tool.LyricStore import LyricStore
+from apps.tool.CircuitBreaker import CircuitBreaker
+from apps.tool.RateLimit import TokenBucket
+from apps.tool.AsyncHttp import AsyncHttpClient
+from apps.tool.DnsCache import CachingHTTPAdapter, DnsCache
+from apps.admin import admin_required
+from apps.song_catalog import save_songs_async
 
 # ========== 全局配置 ==========
 music = Blueprint('music', __name__, url_prefix="/music")
+SONG_DETAIL_URL = "https://interface3.music.163.com/api/v3/song/detail"
+SONG_LYRIC_URL = "https://interface3.music.163.com/api/song/lyric"
+USER_PLAYLIST_URL = "https://music.163.com/api/user/playlist/"
 AES_KEY = getattr(current_config, 'NETEASE_MUSIC_AES_KEY', b"e82ckenh8dichen8")
 MUSIC_LEVEL_MAP = {
     'standard': "标准音质",
@@ -59,6 +76,586 @@ WEB_HEADERS.update({
     'Sec-Ch-Ua-Platform': '"Windows"'
 })
 
+# ========== 缓存 ==========
+# 歌曲详情缓存：key为字符串形式的歌曲ID，value为上游返回的单首歌曲信息
+SONG_DETAIL_CACHE = TTLCache(
+    maxsize=getattr(current_config, 'SONG_DETAIL_CACHE_SIZE', 5000),
+    ttl=getattr(current_config, 'SONG_DETAIL_CACHE_TTL', 3600)
+)
+# 播放URL缓存：key为(歌曲ID, 音质)，过期时间跟随上游返回的expi并预留安全余量
+SONG_URL_CACHE = TTLCache(maxsize=getattr(current_config, 'SONG_URL_CACHE_SIZE', 5000), ttl=0)
+SONG_URL_EXPIRY_MARGIN = getattr(current_config, 'SONG_URL_EXPIRY_MARGIN', 60)
+# 否定结果缓存：无版权/无该音质的播放URL ('url', 歌曲ID, 音质)、无歌词 ('lyric', 歌曲ID)、
+# 歌曲不存在 ('detail', 歌曲ID)，短时间内不再重复请求上游
+NEGATIVE_CACHE = TTLCache(
+    maxsize=getattr(current_config, 'NEGATIVE_CACHE_SIZE', 10000),
+    ttl=getattr(current_config, 'NEGATIVE_CACHE_TTL', 300)
+)
+# 本地歌词存储：歌词基本不会变化，持久化到磁盘并由同主机的所有worker共享
+LYRIC_STORE = LyricStore(
+    getattr(current_config, 'LYRIC_STORE_PATH', 'data/lyrics.db'),
+    max_bytes=getattr(current_config, 'LYRIC_STORE_MAX_BYTES', 200 * 1024 * 1024)
+)
+# 写入歌词存储的字段
+LYRIC_STORE_FIELDS = ('lrc', 'tlyric', 'romalrc', 'nolyric', 'uncollected', 'pureMusic')
+# 搜索结果缓存：key为(规范化后的关键词, 页码)，value为解析后的结果（不保存原始响应内容，避免占用双倍内存）
+# 热门搜索重复率高但结果变化也快，使用较短的过期时间
+SEARCH_CACHE = TTLCache(
+    maxsize=getattr(current_config, 'SEARCH_CACHE_SIZE', 2000),
+    ttl=getattr(current_config, 'SEARCH_CACHE_TTL', 120)
+)
+# 网易云用户歌单缓存：key为用户ID，value为该用户的全部歌单
+USER_PLAYLIST_CACHE = TTLCache(
+    maxsize=getattr(current_config, 'USER_PLAYLIST_CACHE_SIZE', 1000),
+    ttl=getattr(current_config, 'USER_PLAYLIST_CACHE_TTL', 300)
+)
+# 最近已在后台刷新过的歌曲ID，用于限制本地歌曲表的刷新频率
+SONG_REFRESHED = TTLCache(maxsize=20000, ttl=getattr(current_config, 'SONG_REFRESH_INTERVAL', 3600))
+# 并发的相同上游请求只发出一次，其余调用共享结果
+SINGLE_FLIGHT = SingleFlight()
+# 热门歌单和排行榜快照的后台刷新间隔（秒），超过两个间隔仍未刷新时由请求触发后台刷新
+SNAPSHOT_REFRESH_INTERVAL = getattr(current_config, 'SNAPSHOT_REFRESH_INTERVAL', 600)
+# 排行榜页面使用的榜单歌单ID（热歌榜、飙升榜、新歌榜、原创榜）
+CHART_PLAYLIST_IDS = getattr(current_config, 'CHART_PLAYLIST_IDS', [3778678, 19723756, 3779629, 2884035])
+
+# ========== 上游HTTP客户端 ==========
+# 各上游接口的超时时间：(连接超时, 读取超时)，单位秒
+UPSTREAM_CONNECT_TIMEOUT = getattr(current_config, 'UPSTREAM_CONNECT_TIMEOUT', 3)
+UPSTREAM_READ_TIMEOUT = getattr(current_config, 'UPSTREAM_READ_TIMEOUT', 10)
+UPSTREAM_TIMEOUTS = {
+    'song_url': (UPSTREAM_CONNECT_TIMEOUT, 8),
+    'song_detail': (UPSTREAM_CONNECT_TIMEOUT, 8),
+    'song_lyric': (UPSTREAM_CONNECT_TIMEOUT, 6),
+    'search': (UPSTREAM_CONNECT_TIMEOUT, 6),
+    'playlist': (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT),
+    'user_playlist': (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT),
+    'hot_playlists': (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT),
+    'short_link': (UPSTREAM_CONNECT_TIMEOUT, 5),
+}
+
+# 熔断与自适应超时配置
+UPSTREAM_BREAKER_ERROR_RATE = getattr(current_config, 'UPSTREAM_BREAKER_ERROR_RATE', 0.5)
+UPSTREAM_BREAKER_MIN_REQUESTS = getattr(current_config, 'UPSTREAM_BREAKER_MIN_REQUESTS', 10)
+UPSTREAM_BREAKER_OPEN_SECONDS = getattr(current_config, 'UPSTREAM_BREAKER_OPEN_SECONDS', 30)
+UPSTREAM_BREAKER_WINDOW = getattr(current_config, 'UPSTREAM_BREAKER_WINDOW', 50)
+# 读取超时 = 最近成功请求耗时的p99 × 倍数，且不低于最小值、不超过该接口配置的超时
+UPSTREAM_ADAPTIVE_TIMEOUT_FACTOR = getattr(current_config, 'UPSTREAM_ADAPTIVE_TIMEOUT_FACTOR', 3)
+UPSTREAM_ADAPTIVE_TIMEOUT_MIN = getattr(current_config, 'UPSTREAM_ADAPTIVE_TIMEOUT_MIN', 2)
+# 对冲请求配置：幂等读请求超过最近耗时的指定百分位仍未返回时，再发一次相同请求，取先返回的结果
+UPSTREAM_HEDGE_ENABLED = getattr(current_config, 'UPSTREAM_HEDGE_ENABLED', True)
+UPSTREAM_HEDGE_PERCENTILE = getattr(current_config, 'UPSTREAM_HEDGE_PERCENTILE', 95)
+# 对冲请求数量上限占普通请求数的比例，避免上游变慢时请求量翻倍
+UPSTREAM_HEDGE_BUDGET = getattr(current_config, 'UPSTREAM_HEDGE_BUDGET', 0.05)
+# 执行可对冲请求（第一次请求和对冲请求）的线程池（与UPSTREAM_EXECUTOR分开，避免在上游线程池内等待自身造成死锁）
+# 只在有空闲线程时提交，任务不会排队；线程都在忙时第一次请求改在调用线程中直接发送，不再对冲
+UPSTREAM_HEDGE_WORKERS = getattr(current_config, 'UPSTREAM_HEDGE_WORKERS', 32)
+HEDGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=UPSTREAM_HEDGE_WORKERS,
+    thread_name_prefix='upstream-hedge'
+)
+
+# 上游请求优先级（数字越小优先级越高）
+PRIORITY_PLAYBACK = 0  # 播放URL、短链接解析
+PRIORITY_LYRIC = 1  # 歌词
+PRIORITY_METADATA = 2  # 封面、歌曲详情、搜索、歌单详情
+PRIORITY_BACKGROUND = 3  # 后台刷新、热门歌单、用户歌单列表
+# 各优先级的令牌规则：(取令牌后需保留的令牌占桶容量的比例, 最长排队时间秒)
+UPSTREAM_PRIORITY_RULES = {
+    PRIORITY_PLAYBACK: (0.0, 5.0),
+    PRIORITY_LYRIC: (0.1, 2.0),
+    PRIORITY_METADATA: (0.25, 1.0),
+    PRIORITY_BACKGROUND: (0.5, 0.5),
+}
+# 各上游接口的默认优先级
+UPSTREAM_ENDPOINT_PRIORITY = {
+    'song_url': PRIORITY_PLAYBACK,
+    'short_link': PRIORITY_PLAYBACK,
+    'song_lyric': PRIORITY_LYRIC,
+    'song_detail': PRIORITY_METADATA,
+    'search': PRIORITY_METADATA,
+    'playlist': PRIORITY_METADATA,
+    'user_playlist': PRIORITY_BACKGROUND,
+    'hot_playlists': PRIORITY_BACKGROUND,
+}
+# 每个上游接口的令牌补充速度（个/秒）和桶容量
+UPSTREAM_RATE_PER_SECOND = getattr(current_config, 'UPSTREAM_RATE_PER_SECOND', 20)
+UPSTREAM_RATE_BURST = getattr(current_config, 'UPSTREAM_RATE_BURST', 40)
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """上游接口熔断中，请求未发出"""
+
+
+class UpstreamThrottled(requests.RequestException):
+    """上游请求额度不足，低优先级请求被丢弃，请求未发出"""
+
+
+class UpstreamGovernor(object):
+    """上游请求限速器
+
+    - 每个上游接口一个令牌桶，避免突发请求触发网易云限流
+    - 按优先级分配令牌：令牌紧张时低优先级请求排队或直接丢弃，余量留给播放URL等高优先级请求
+    """
+
+    def __init__(self, rate=20, burst=40):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {}
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = TokenBucket(rate=self.rate, capacity=self.burst)
+                self._buckets[endpoint] = bucket
+            return bucket
+
+    def acquire(self, endpoint: str, priority: int = None):
+        """为一次上游请求取令牌
+
+        Raises:
+            UpstreamThrottled: 在该优先级允许的排队时间内取不到令牌
+        """
+        if priority is None:
+            priority = UPSTREAM_ENDPOINT_PRIORITY.get(endpoint, PRIORITY_METADATA)
+        reserve_ratio, max_wait = UPSTREAM_PRIORITY_RULES[priority]
+        bucket = self.bucket(endpoint)
+        start = time.monotonic()
+        granted = bucket.acquire(reserve=reserve_ratio * bucket.capacity, timeout=max_wait)
+        waited = time.monotonic() - start
+        with self._lock:
+            stats = self._stats.setdefault((endpoint, priority), {'granted': 0, 'queued': 0, 'shed': 0, 'wait_time': 0.0})
+            stats['wait_time'] += waited
+            if not granted:
+                stats['shed'] += 1
+            else:
+                stats['granted'] += 1
+                if waited > 0.001:
+                    stats['queued'] += 1
+        if not granted:
+            raise UpstreamThrottled(f"上游请求过于频繁，已丢弃低优先级请求：{endpoint}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+            items = {key: dict(value) for key, value in self._stats.items()}
+        result = {}
+        for endpoint, bucket in buckets.items():
+            result[endpoint] = {
+                'tokens': round(bucket.available(), 2),
+                'priorities': {
+                    str(priority): {
+                        'granted': item['granted'],
+                        'queued': item['queued'],
+                        'shed': item['shed'],
+                        'avg_wait_ms': round(item['wait_time'] * 1000 / (item['granted'] + item['shed']), 2)
+                        if item['granted'] + item['shed'] else 0
+                    }
+                    for (name, priority), item in sorted(items.items()) if name == endpoint
+                }
+            }
+        return result
+
+
+GOVERNOR = UpstreamGovernor(rate=UPSTREAM_RATE_PER_SECOND, burst=UPSTREAM_RATE_BURST)
+
+# 批量并发请求使用的asyncio客户端：一个线程等待任意数量的请求，同时进行的请求数受信号量限制
+# 上游域名解析结果缓存时间（秒），只对上游客户端生效
+UPSTREAM_DNS_CACHE_TTL = getattr(current_config, 'UPSTREAM_DNS_CACHE_TTL', 60)
+
+ASYNC_UPSTREAM = AsyncHttpClient(
+    concurrency=getattr(current_config, 'ASYNC_UPSTREAM_CONCURRENCY', 20),
+    limit_per_host=getattr(current_config, 'ASYNC_UPSTREAM_CONCURRENCY', 20),
+    dns_cache_ttl=UPSTREAM_DNS_CACHE_TTL
+)
+
+
+class UpstreamClient(object):
+    """网易云上游共享HTTP客户端
+
+    - 所有上游请求复用同一个Session，按主机维护keep-alive连接池
+    - 新建连接时使用客户端自己的DNS缓存解析域名（不影响进程内的其他连接）
+    - 按接口名称应用不同的超时时间，并根据最近的耗时自适应缩短读取超时
+    - 每个接口独立熔断：失败率过高时直接抛出UpstreamUnavailable，不再占用线程等待上游
+    - 幂等读请求可开启对冲（hedge=True），降低长尾耗时
+    - 熔断放行后、发出请求前按接口和优先级向GOVERNOR取令牌
+    - 多个同类请求可通过fetch_many交给ASYNC_UPSTREAM并发执行，不额外占用线程
+    - 统计每个接口的请求数、失败数和耗时
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=50, dns_cache_ttl=60):
+        self.session = requests.Session()
+        # 禁止Session保存上游下发的Cookie，避免不同请求之间互相污染
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.dns_cache = DnsCache(ttl=dns_cache_ttl)
+        self.adapter = CachingHTTPAdapter(
+            self.dns_cache, pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self._lock = threading.Lock()
+        self._endpoint_stats = {}
+        self._breakers = {}
+        self._hedge_tokens = 1.0
+        self._hedge_stats = {'eligible': 0, 'issued': 0, 'wins': 0, 'budget_exhausted': 0, 'pool_busy': 0}
+        # HEDGE_EXECUTOR中正在执行的请求数（第一次请求和对冲请求）
+        self._hedge_pool_in_flight = 0
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    error_rate=UPSTREAM_BREAKER_ERROR_RATE,
+                    min_requests=UPSTREAM_BREAKER_MIN_REQUESTS,
+                    open_seconds=UPSTREAM_BREAKER_OPEN_SECONDS,
+                    window_size=UPSTREAM_BREAKER_WINDOW
+                )
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def timeout_for(self, endpoint: str):
+        connect_timeout, read_timeout = UPSTREAM_TIMEOUTS.get(endpoint, (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT))
+        breaker = self.breaker(endpoint)
+        # 半开探测和超时之后的调用使用完整超时，避免上游整体变慢后自适应超时把所有调用都判为失败
+        if breaker.wants_full_timeout():
+            return connect_timeout, read_timeout
+        p99 = breaker.percentile(99)
+        if p99 is not None:
+            read_timeout = min(read_timeout, max(UPSTREAM_ADAPTIVE_TIMEOUT_MIN, p99 * UPSTREAM_ADAPTIVE_TIMEOUT_FACTOR))
+        return connect_timeout, read_timeout
+
+    def request(self, method: str, url: str, endpoint: str = 'default', hedge: bool = False,
+                priority: int = None, **kwargs) -> requests.Response:
+        if hedge and UPSTREAM_HEDGE_ENABLED:
+            return self._hedged_send(method, url, endpoint, priority, **kwargs)
+        return self._send(method, url, endpoint, priority, **kwargs)
+
+    def _send(self, method: str, url: str, endpoint: str, priority: int = None, on_start=None,
+              **kwargs) -> requests.Response:
+        """经过限速和熔断后发送请求，on_start在真正发出请求前调用（参数为开始时间）"""
+        # 先检查熔断再取令牌，熔断中被拒绝的调用不消耗限速令牌
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            raise UpstreamUnavailable(f"上游接口暂时不可用（熔断中）：{endpoint}")
+        try:
+            GOVERNOR.acquire(endpoint, priority)
+        except Exception:
+            breaker.cancel()
+            raise
+        timeout = kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        start = time.perf_counter()
+        if on_start is not None:
+            on_start(start)
+        failed = True
+        timed_out = False
+        try:
+            response = self.session.request(method, url, **kwargs)
+            # 5xx视为上游故障，计入熔断统计
+            failed = response.status_code >= 500
+            return response
+        except requests.exceptions.ReadTimeout:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if timed_out:
+                # 超时按读取超时时间计入耗时分位数
+                elapsed = timeout[1] if isinstance(timeout, tuple) else timeout
+            breaker.record(not failed, elapsed, timed_out)
+            self._record(endpoint, elapsed, failed)
+
+    def _hedged_send(self, method: str, url: str, endpoint: str, priority: int = None,
+                     **kwargs) -> requests.Response:
+        """发送请求，超过该接口最近耗时的UPSTREAM_HEDGE_PERCENTILE分位仍未返回时发出对冲请求
+
+        第一次请求和对冲请求都在HEDGE_EXECUTOR中执行，调用线程只负责等待；任务只在有空闲线程时提交，不会排队。
+        线程池已满时第一次请求在调用线程中直接发送，不发出对冲。
+        是否超时从第一次请求真正发出（取得令牌、通过熔断检查之后）开始计算。
+        """
+        delay = self.breaker(endpoint).percentile(UPSTREAM_HEDGE_PERCENTILE)
+        with self._lock:
+            # 每个请求积累一定比例的对冲额度，最多积累10次
+            self._hedge_tokens = min(10.0, self._hedge_tokens + UPSTREAM_HEDGE_BUDGET)
+            if delay is not None:
+                if self._hedge_pool_in_flight >= UPSTREAM_HEDGE_WORKERS:
+                    self._hedge_stats['pool_busy'] += 1
+                    delay = None
+                else:
+                    self._hedge_pool_in_flight += 1
+        if delay is None:
+            # 样本不足时无法判断是否慢请求，或线程池已满，直接发送
+            return self._send(method, url, endpoint, priority, **kwargs)
+
+        started = threading.Event()
+        started_at = []
+
+        def on_start(start):
+            started_at.append(start)
+            started.set()
+
+        def run_primary():
+            try:
+                return self._send(method, url, endpoint, priority, on_start=on_start, **kwargs)
+            finally:
+                started.set()
+                with self._lock:
+                    self._hedge_pool_in_flight -= 1
+
+        primary = HEDGE_EXECUTOR.submit(run_primary)
+        # 等待请求真正发出（限速排队、熔断拒绝时不计入对冲等待时间）
+        started.wait()
+        if not started_at:
+            return primary.result()
+        done, _ = wait([primary], timeout=max(0.0, started_at[0] + delay - time.perf_counter()))
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self._hedge_stats['eligible'] += 1
+            if self._hedge_pool_in_flight >= UPSTREAM_HEDGE_WORKERS:
+                # 对冲线程池已满，排队的对冲请求不会比第一次请求更快，也不消耗对冲额度
+                self._hedge_stats['pool_busy'] += 1
+                issue = False
+            elif self._hedge_tokens < 1:
+                self._hedge_stats['budget_exhausted'] += 1
+                issue = False
+            else:
+                self._hedge_tokens -= 1
+                self._hedge_stats['issued'] += 1
+                self._hedge_pool_in_flight += 1
+                issue = True
+        if not issue:
+            return primary.result()
+
+        hedged = HEDGE_EXECUTOR.submit(self._send_hedge, method, url, endpoint, priority, **kwargs)
+        pending = {primary, hedged}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if future is hedged:
+                    with self._lock:
+                        self._hedge_stats['wins'] += 1
+                return response
+        raise error
+
+    def _send_hedge(self, method: str, url: str, endpoint: str, priority: int = None,
+                    **kwargs) -> requests.Response:
+        try:
+            return self._send(method, url, endpoint, priority, **kwargs)
+        finally:
+            with self._lock:
+                self._hedge_pool_in_flight -= 1
+
+    def fetch_many(self, method: str, endpoint: str, calls: List, priority: int = None) -> List:
+        """通过asyncio客户端并发请求同一上游接口，并解析JSON响应
+
+        与单个请求一样经过限速、熔断和统计，适合批量歌词、分块歌曲详情等扇出请求
+
+        Args:
+            method: 请求方法
+            endpoint: 上游接口名称
+            calls: [(url, kwargs)]，kwargs为aiohttp请求参数
+            priority: 请求优先级，默认使用接口的优先级
+
+        Returns:
+            与calls顺序一致的列表，每项为解析后的JSON字典或异常（requests.RequestException/ValueError）
+        """
+        breaker = self.breaker(endpoint)
+        results = [None] * len(calls)
+        allowed = []
+        for index, (url, kwargs) in enumerate(calls):
+            if not breaker.allow():
+                results[index] = UpstreamUnavailable(f"上游接口暂时不可用（熔断中）：{endpoint}")
+                continue
+            try:
+                GOVERNOR.acquire(endpoint, priority)
+            except UpstreamThrottled as e:
+                breaker.cancel()
+                results[index] = e
+                continue
+            allowed.append(index)
+
+        connect_timeout, read_timeout = self.timeout_for(endpoint)
+        responses = ASYNC_UPSTREAM.fetch_many(
+            [(method, calls[index][0], calls[index][1]) for index in allowed],
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout
+        )
+        for index, response in zip(allowed, responses):
+            if isinstance(response, Exception):
+                breaker.record(False, read_timeout, isinstance(response, asyncio.TimeoutError))
+                self._record(endpoint, read_timeout, True)
+                results[index] = requests.RequestException(f"{type(response).__name__}: {response}")
+                continue
+            status, body, elapsed = response
+            breaker.record(status < 500, elapsed)
+            self._record(endpoint, elapsed, status >= 500)
+            if status >= 400:
+                results[index] = requests.HTTPError(f"{status} Error: {calls[index][0]}")
+                continue
+            try:
+                results[index] = json.loads(body.decode('utf-8'))
+            except ValueError as e:
+                results[index] = e
+        return results
+
+    def get(self, url: str, endpoint: str = 'default', **kwargs) -> requests.Response:
+        return self.request('GET', url, endpoint, **kwargs)
+
+    def post(self, url: str, endpoint: str = 'default', **kwargs) -> requests.Response:
+        return self.request('POST', url, endpoint, **kwargs)
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool):
+        with self._lock:
+            stats = self._endpoint_stats.setdefault(endpoint, {'requests': 0, 'errors': 0, 'total_time': 0.0})
+            stats['requests'] += 1
+            stats['total_time'] += elapsed
+            if failed:
+                stats['errors'] += 1
+
+    def pool_stats(self) -> List[Dict]:
+        """各主机连接池的使用情况"""
+        pools = []
+        manager = self.adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': pool.pool.qsize() if pool.pool else 0,
+                'maxsize': pool.pool.maxsize if pool.pool else 0
+            })
+        return pools
+
+    def stats(self) -> Dict:
+        with self._lock:
+            endpoints = {
+                name: {
+                    'requests': item['requests'],
+                    'errors': item['errors'],
+                    'avg_ms': round(item['total_time'] * 1000 / item['requests'], 2) if item['requests'] else 0
+                }
+                for name, item in self._endpoint_stats.items()
+            }
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'pools': self.pool_stats(),
+            'endpoints': endpoints,
+            'breakers': {
+                name: dict(breaker.stats(), timeout=self.timeout_for(name))
+                for name, breaker in breakers.items()
+            },
+            'hedge': self.hedge_stats(),
+            'governor': GOVERNOR.stats(),
+            'async': ASYNC_UPSTREAM.stats(),
+            'dns_cache': self.dns_cache.stats(),
+            'background_pending': background_pending()
+        }
+
+    def hedge_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._hedge_stats, enabled=UPSTREAM_HEDGE_ENABLED, tokens=round(self._hedge_tokens, 2))
+        stats['win_rate'] = round(stats['wins'] / stats['issued'], 4) if stats['issued'] else 0.0
+        return stats
+
+
+UPSTREAM = UpstreamClient(
+    pool_connections=getattr(current_config, 'UPSTREAM_POOL_CONNECTIONS', 10),
+    pool_maxsize=getattr(current_config, 'UPSTREAM_POOL_MAXSIZE', 50),
+    dns_cache_ttl=UPSTREAM_DNS_CACHE_TTL
+)
+
+# 上游并发请求线程池（限制同时进行的上游请求数量）
+UPSTREAM_EXECUTOR = ThreadPoolExecutor(
+    max_workers=getattr(current_config, 'UPSTREAM_EXECUTOR_WORKERS', 16),
+    thread_name_prefix='upstream'
+)
+# 预取、后台刷新等后台任务的线程池，与UPSTREAM_EXECUTOR分开，后台任务积压时不占用前台请求（/jx、批量接口）的线程
+BACKGROUND_EXECUTOR = ThreadPoolExecutor(
+    max_workers=getattr(current_config, 'UPSTREAM_BACKGROUND_WORKERS', 4),
+    thread_name_prefix='upstream-background'
+)
+# 后台线程池中排队和执行中的任务数超过该值时不再接受预取任务（推测性请求，丢弃不影响播放）
+PREFETCH_MAX_PENDING = getattr(current_config, 'PREFETCH_MAX_PENDING', 32)
+_background_lock = threading.Lock()
+_background_pending = 0
+# 解析接口整体超时时间（秒）
+PARSE_DEADLINE = getattr(current_config, 'PARSE_DEADLINE', 12)
+# 大批量获取歌曲详情时，每次上游请求包含的歌曲数
+SONG_DETAIL_CHUNK_SIZE = getattr(current_config, 'SONG_DETAIL_CHUNK_SIZE', 200)
+# 用户歌单每页数量，以及第一页之后每轮并发请求的页数
+USER_PLAYLIST_PAGE_SIZE = 100
+USER_PLAYLIST_PAGE_CONCURRENCY = getattr(current_config, 'USER_PLAYLIST_PAGE_CONCURRENCY', 4)
+# 预取接口单次最多预取的歌曲数
+PREFETCH_MAX_IDS = getattr(current_config, 'PREFETCH_MAX_IDS', 10)
+# 批量歌曲信息接口单次最多查询的歌曲数
+BATCH_MAX_IDS = getattr(current_config, 'BATCH_MAX_IDS', 100)
+# 批量歌曲信息接口支持的字段，前五项来自歌曲详情
+BATCH_DETAIL_FIELDS = ('cover', 'name', 'artist', 'album', 'duration')
+BATCH_FIELDS = BATCH_DETAIL_FIELDS + ('url', 'lyric')
+
+
+def submit_upstream(func, *args, **kwargs) -> Future:
+    """在上游线程池中执行函数，并为其推送当前应用上下文（以便使用current_app）"""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return UPSTREAM_EXECUTOR.submit(run)
+
+
+def submit_background(func, *args, **kwargs) -> Future:
+    """在后台线程池中执行函数（预取、后台刷新），并为其推送当前应用上下文"""
+    global _background_pending
+    app = current_app._get_current_object()
+
+    def run():
+        global _background_pending
+        try:
+            with app.app_context():
+                return func(*args, **kwargs)
+        finally:
+            with _background_lock:
+                _background_pending -= 1
+
+    with _background_lock:
+        _background_pending += 1
+    try:
+        return BACKGROUND_EXECUTOR.submit(run)
+    except BaseException:
+        with _background_lock:
+            _background_pending -= 1
+        raise
+
+
+def background_pending() -> int:
+    """后台线程池中排队和执行中的任务数"""
+    with _background_lock:
+        return _background_pending
+
+
+def wait_result(future: Future, deadline: float, default):
+    """在截止时间（time.monotonic()）之前等待结果，超时返回default"""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        return default
+
 # ========== 数据模型 ==========
 @dataclass
 class SongInfo:
@@ -107,14 +704,14 @@ def read_cookie() -> str:
         return ""
 
 
-def request_post(url: str, params: str, cookie: Dict[str, str]) -> Dict[str, Union[str, int]]:
+def request_post(url: str, params: str, cookie: Dict[str, str], priority: int = None) -> Dict[str, Union[str, int]]:
     headers = DEFAULT_HEADERS.copy()
     cookies = {"os": "pc", "appver": "", "osver": "", "deviceId": "pyncm!"}
     cookies.update(cookie)
 
     try:
-        response = requests.post(
-            url, headers=headers, cookies=cookies, data={"params": params}, timeout=10
+        response = UPSTREAM.post(
+            url, endpoint='song_url', priority=priority, headers=headers, cookies=cookies, data={"params": params}
         )
         response.raise_for_status()
         return response.json()
@@ -134,7 +731,7 @@ def parse_song_id(ids: str) -> str:
         return ""
     if '163cn.tv' in ids:
         try:
-            response = requests.get(ids, allow_redirects=False, timeout=5)
+            response = UPSTREAM.get(ids, endpoint='short_link', allow_redirects=False)
             ids = response.headers.get('Location', ids)
         except requests.RequestException:
             current_app.logger.warning(f"短链接解析失败：{ids}")
@@ -145,6 +742,11 @@ def parse_song_id(ids: str) -> str:
     return ids.strip()
 
 
+def normalize_search_query(name: str) -> str:
+    """规范化搜索关键词：全角转半角（NFKC）、忽略大小写、合并连续空白"""
+    return ' '.join(unicodedata.normalize('NFKC', name).casefold().split())
+
+
 def format_file_size(size_bytes: int) -> str:
     if size_bytes <= 0:
         return "0B"
@@ -162,16 +764,85 @@ def get_music_level(level: str) -> str:
 
 
 def get_song_url(song_id: Union[str, int], level: str, cookies: Dict[str, str]) -> Dict[str, Union[str, int]]:
-    url = "https://interface3.music.163.com/eapi/song/enhance/player/url/v1"
     if not song_id or not level:
         return {"code": 400, "message": "歌曲ID和音质不能为空"}
+    return get_songs_url([song_id], level, cookies)
+
+
+def get_songs_url(song_ids: List[Union[str, int]], level: str, cookies: Dict[str, str],
+                  priority: int = None) -> Dict[str, Union[str, int, List]]:
+    """批量获取播放URL
+
+    优先读取播放URL缓存，未命中的歌曲合并为一次EAPI请求
 
+    Args:
+        song_ids: 歌曲ID列表
+        level: 音质
+        cookies: 请求上游使用的Cookie
+        priority: 上游请求优先级，默认为播放优先级（预取等推测性请求应使用更低的优先级）
+
+    Returns:
+        包含播放URL的字典，data按传入顺序排列（上游未返回的歌曲不包含在内）
+    """
+    if not song_ids or not level:
+        return {"code": 400, "message": "歌曲ID和音质不能为空"}
+
+    keys = list(dict.fromkeys(str(song_id) for song_id in song_ids))
+    cached, missing = SONG_URL_CACHE.get_many([(key, level) for key in keys])
+    items = {cache_key[0]: item for cache_key, item in cached.items()}
+    if missing:
+        # 最近确认没有可用URL的歌曲直接返回上次的结果（url为null）
+        unavailable, _ = NEGATIVE_CACHE.get_many([('url',) + cache_key for cache_key in missing])
+        items.update({negative_key[1]: item for negative_key, item in unavailable.items()})
+        missing = [cache_key for cache_key in missing if cache_key[0] not in items]
+
+    if missing:
+        missing_ids = tuple(cache_key[0] for cache_key in missing)
+        # 优先级计入合并key：播放请求不会合并到可能被丢弃的低优先级预取请求上
+        result = SINGLE_FLIGHT.do(
+            ('song_url', missing_ids, level, priority), _load_songs_url, missing_ids, level, cookies, priority
+        )
+        if result.get('code') == 200:
+            items.update({str(item['id']): item for item in result.get('data') or [] if item and 'id' in item})
+        elif not items:
+            return result
+
+    return {
+        "code": 200,
+        "data": [items[key] for key in keys if key in items]
+    }
+
+
+def _load_songs_url(song_ids: List[str], level: str, cookies: Dict[str, str],
+                    priority: int = None) -> Dict[str, Union[str, int]]:
+    """请求上游播放URL并写入缓存"""
+    result = request_songs_url(song_ids, level, cookies, priority)
+    if result.get('code') == 200:
+        for item in result.get('data') or []:
+            if not item or 'id' not in item:
+                continue
+            cache_key = (str(item['id']), level)
+            if item.get('url'):
+                # 在上游URL失效前提前过期，上游未返回有效期时不缓存
+                ttl = (item.get('expi') or 0) - SONG_URL_EXPIRY_MARGIN
+                if ttl > 0:
+                    SONG_URL_CACHE.set(cache_key, item, ttl)
+            else:
+                # 无版权或无该音质的歌曲，短时间内不再重复请求上游
+                NEGATIVE_CACHE.set(('url',) + cache_key, item)
+    return result
+
+
+def request_songs_url(song_ids: List[Union[str, int]], level: str, cookies: Dict[str, str],
+                      priority: int = None) -> Dict[str, Union[str, int]]:
+    """通过EAPI请求上游获取播放URL（不经过缓存），一次请求可包含多首歌曲"""
+    url = "https://interface3.music.163.com/eapi/song/enhance/player/url/v1"
     config = {
         "os": "pc", "appver": "", "osver": "", "deviceId": "pyncm!",
         "requestId": str(randrange(20000000, 30000000))
     }
     payload = {
-        'ids': [str(song_id)], 'level': level, 'encodeType': 'flac',
+        'ids': [str(song_id) for song_id in song_ids], 'level': level, 'encodeType': 'flac',
         'header': json.dumps(config)
     }
     if level == 'sky':
@@ -189,7 +860,7 @@ def get_song_url(song_id: Union[str, int], level: str, cookies: Dict[str, str])
         encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
         encrypted_params = hex_digest(encrypted_data)
 
-        return request_post(url, encrypted_params, cookies)
+        return request_post(url, encrypted_params, cookies, priority)
     except Exception as e:
         current_app.logger.error(f"加密失败：{str(e)}")
         return {"code": 500, "message": f"加密失败：{str(e)}"}
@@ -209,41 +880,292 @@ def get_song_detail(song_id: Union[str, int]) -> Dict[str, Union[str, int, List]
 def get_songs_detail(song_ids: List[Union[str, int]]) -> Dict[str, Union[str, int, List]]:
     """批量获取多个歌曲详情
     
+    优先读取歌曲详情缓存，只把未命中的ID合并为一次批量请求发往上游
+    
     Args:
         song_ids: 歌曲ID列表
     
     Returns:
-        包含所有歌曲详情的字典
+        包含所有歌曲详情的字典，songs按传入顺序排列（上游未返回的歌曲不包含在内）
+    """
+    # 去重并保持顺序，统一使用字符串作为缓存key
+    keys = list(dict.fromkeys(str(song_id) for song_id in song_ids))
+    cached, missing = SONG_DETAIL_CACHE.get_many(keys)
+    if missing:
+        # 最近确认不存在的歌曲不再请求上游
+        not_found, _ = NEGATIVE_CACHE.get_many([('detail', key) for key in missing])
+        missing = [key for key in missing if ('detail', key) not in not_found]
+
+    if missing:
+        # key包含优先级，前台请求不会合并到后台刷新的低优先级请求上排队
+        result = SINGLE_FLIGHT.do(('song_detail', tuple(missing), None), _load_songs_detail, missing)
+        if result.get('code') == 200:
+            cached.update(result['fetched'])
+        elif not cached:
+            # 上游失败且没有任何缓存命中时，原样返回错误
+            return result
+
+    return {
+        "code": 200,
+        "songs": [cached[key] for key in keys if key in cached]
+    }
+
+
+def get_songs_detail_bulk(song_ids: List[Union[str, int]]) -> Dict[str, Union[str, int, List]]:
+    """大批量获取歌曲详情（适用于上千首歌曲的歌单）
+
+    未命中缓存的歌曲按SONG_DETAIL_CHUNK_SIZE分块，所有分块通过asyncio客户端并发请求上游。
+    单个分块失败只会缺少该分块的歌曲，不影响其他分块。
+
+    Args:
+        song_ids: 歌曲ID列表
+
+    Returns:
+        与get_songs_detail相同格式的字典，songs按传入顺序排列
     """
-    url = "https://interface3.music.163.com/api/v3/song/detail"
+    keys = list(dict.fromkeys(str(song_id) for song_id in song_ids))
+    if len(keys) <= SONG_DETAIL_CHUNK_SIZE:
+        return get_songs_detail(keys)
+
+    cached, missing = SONG_DETAIL_CACHE.get_many(keys)
+    if missing:
+        not_found, _ = NEGATIVE_CACHE.get_many([('detail', key) for key in missing])
+        missing = [key for key in missing if ('detail', key) not in not_found]
+    chunks = [missing[i:i + SONG_DETAIL_CHUNK_SIZE] for i in range(0, len(missing), SONG_DETAIL_CHUNK_SIZE)]
+
+    results = UPSTREAM.fetch_many('POST', 'song_detail', [
+        (SONG_DETAIL_URL, {'data': {'c': json.dumps([{"id": song_id, "v": 0} for song_id in chunk])},
+                           'headers': WEB_HEADERS})
+        for chunk in chunks
+    ])
+    error = None
+    for index, (chunk, result) in enumerate(zip(chunks, results)):
+        if isinstance(result, Exception) or result.get('code') != 200:
+            error = result
+            current_app.logger.warning(f"歌曲详情分块获取失败：第{index + 1}/{len(chunks)}块，错误：{str(error)}")
+            continue
+        cached.update(_store_songs_detail(chunk, result))
+
+    if not cached and error is not None:
+        return {"code": 500, "message": f"批量获取详情失败：{str(error)}"}
+    return {
+        "code": 200,
+        "songs": [cached[key] for key in keys if key in cached]
+    }
+
+
+def _load_songs_detail(song_ids: List[str], priority: int = None) -> Dict[str, Union[str, int, Dict]]:
+    """请求上游批量获取歌曲详情并写入缓存，fetched为 {歌曲ID: 歌曲信息}"""
     try:
-        # 构建批量请求数据
-        song_list = [{"id": str(song_id), "v": 0} for song_id in song_ids]
+        # 构建批量请求数据（仅包含未命中缓存的歌曲）
+        song_list = [{"id": song_id, "v": 0} for song_id in song_ids]
         data = {'c': json.dumps(song_list)}
-        response = requests.post(url, data=data, headers=WEB_HEADERS, timeout=10)
+        response = UPSTREAM.post(
+            SONG_DETAIL_URL, endpoint='song_detail', hedge=True, priority=priority, data=data, headers=WEB_HEADERS
+        )
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        result = response.json()
+    except (requests.RequestException, ValueError) as e:
         current_app.logger.error(f"批量获取歌曲详情失败，错误：{str(e)}")
         return {"code": 500, "message": f"批量获取详情失败：{str(e)}"}
 
+    if result.get('code') != 200:
+        return result
+    return {"code": 200, "fetched": _store_songs_detail(song_ids, result)}
+
+
+def _store_songs_detail(song_ids: List[str], result: Dict) -> Dict[str, Dict]:
+    """把上游返回的歌曲详情写入缓存和本地歌曲表，返回 {歌曲ID: 歌曲信息}"""
+    fetched = {str(song['id']): song for song in result.get('songs') or [] if song and 'id' in song}
+    SONG_DETAIL_CACHE.set_many(fetched)
+    NEGATIVE_CACHE.set_many({('detail', song_id): True for song_id in song_ids if song_id not in fetched})
+    # 同时写入本地歌曲表
+    save_songs_async(fetched.values())
+    return fetched
+
+
+def refresh_songs_detail(song_ids: List[Union[str, int]]):
+    """在后台跳过缓存重新获取歌曲详情（结果写入缓存和本地歌曲表），不等待结果
+
+    同一首歌曲在SONG_REFRESH_INTERVAL内只刷新一次，避免上游已下架的歌曲被反复请求
+    """
+    keys = [key for key in dict.fromkeys(str(song_id) for song_id in song_ids)
+            if SONG_REFRESHED.get(key) is None]
+    if not keys:
+        return
+    SONG_REFRESHED.set_many({key: True for key in keys})
+    for i in range(0, len(keys), SONG_DETAIL_CHUNK_SIZE):
+        chunk = tuple(keys[i:i + SONG_DETAIL_CHUNK_SIZE])
+        submit_background(
+            SINGLE_FLIGHT.do, ('song_detail', chunk, PRIORITY_BACKGROUND),
+            _load_songs_detail, list(chunk), PRIORITY_BACKGROUND
+        )
+
 
 def get_song_lyric(song_id: Union[str, int], cookies: Dict[str, str]) -> Dict[str, Union[str, int]]:
-    url = "https://interface3.music.163.com/api/song/lyric"
-    data = {
+    stored = LYRIC_STORE.get(song_id)
+    if stored is None:
+        stored = NEGATIVE_CACHE.get(('lyric', str(song_id)))
+    if stored is not None:
+        return dict(stored, code=200)
+    return SINGLE_FLIGHT.do(('song_lyric', str(song_id)), _load_song_lyric, song_id, cookies)
+
+
+def get_songs_lyric(song_ids: List[Union[str, int]], cookies: Dict[str, str]) -> Dict[str, Dict]:
+    """批量获取歌词，本地没有的歌词通过asyncio客户端并发请求上游
+
+    Returns:
+        {歌曲ID: 与get_song_lyric格式相同的结果}
+    """
+    results = {}
+    missing = []
+    for song_id in dict.fromkeys(str(song_id) for song_id in song_ids):
+        stored = LYRIC_STORE.get(song_id)
+        if stored is None:
+            stored = NEGATIVE_CACHE.get(('lyric', song_id))
+        if stored is not None:
+            results[song_id] = dict(stored, code=200)
+        else:
+            missing.append(song_id)
+
+    if len(missing) == 1:
+        # 只有一首时走单个请求（合并并发请求、对冲）
+        results[missing[0]] = get_song_lyric(missing[0], cookies)
+        return results
+    responses = UPSTREAM.fetch_many('POST', 'song_lyric', [
+        (SONG_LYRIC_URL, {'data': lyric_request_data(song_id), 'cookies': cookies, 'headers': WEB_HEADERS})
+        for song_id in missing
+    ])
+    for song_id, result in zip(missing, responses):
+        if isinstance(result, Exception):
+            current_app.logger.error(f"获取歌词失败：{song_id}，错误：{str(result)}")
+            results[song_id] = {"code": 500, "message": f"获取歌词失败：{str(result)}"}
+        else:
+            _store_song_lyric(song_id, result)
+            results[song_id] = result
+    return results
+
+
+def lyric_request_data(song_id: Union[str, int]) -> Dict[str, str]:
+    return {
         'id': str(song_id), 'cp': 'false', 'tv': '0', 'lv': '0', 'rv': '0',
         'kv': '0', 'yv': '0', 'ytv': '0', 'yrv': '0'
     }
+
+
+def _load_song_lyric(song_id: Union[str, int], cookies: Dict[str, str]) -> Dict[str, Union[str, int]]:
+    """请求上游歌词并写入本地歌词存储"""
     try:
-        response = requests.post(
-            url, data=data, cookies=cookies, headers=WEB_HEADERS, timeout=10
+        response = UPSTREAM.post(
+            SONG_LYRIC_URL, endpoint='song_lyric', hedge=True, data=lyric_request_data(song_id),
+            cookies=cookies, headers=WEB_HEADERS
         )
         response.raise_for_status()
-        return response.json()
+        result = response.json()
     except requests.RequestException as e:
         current_app.logger.error(f"获取歌词失败：{song_id}，错误：{str(e)}")
         return {"code": 500, "message": f"获取歌词失败：{str(e)}"}
 
+    _store_song_lyric(song_id, result)
+    return result
+
+
+def _store_song_lyric(song_id: Union[str, int], result: Dict):
+    """把上游返回的歌词写入本地歌词存储（无歌词时写入否定结果缓存）"""
+    if result.get('code') == 200:
+        stored = {key: result[key] for key in LYRIC_STORE_FIELDS if key in result}
+        if (result.get('lrc') or {}).get('lyric'):
+            LYRIC_STORE.set(song_id, stored)
+        else:
+            # 纯音乐或暂无歌词，歌词以后可能会被收录，只短时间缓存
+            NEGATIVE_CACHE.set(('lyric', str(song_id)), stored)
+
+
+def parse_fields_spec(spec: str) -> Dict:
+    """把fields参数（逗号分隔的点号路径，如 result.songs.id,result.songs.name）解析为字段树"""
+    tree = {}
+    for path in spec.split(','):
+        node = tree
+        for key in [key.strip() for key in path.split('.') if key.strip()]:
+            node = node.setdefault(key, {})
+    return tree
+
+
+def project_fields(data, tree: Dict):
+    """按字段树裁剪JSON数据，列表会逐项裁剪，叶子节点保留完整的值"""
+    if not tree:
+        return data
+    if isinstance(data, list):
+        return [project_fields(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {key: project_fields(data[key], subtree) for key, subtree in tree.items() if key in data}
+    return data
+
+
+def upstream_json_response(data: Dict, body: bytes = None) -> Response:
+    """返回代理的上游JSON数据
+
+    - fields参数：只返回指定路径的字段（顶层code始终保留）
+    - raw=1且有上游原始响应内容时：直接返回原始内容，不再序列化；没有原始内容（如缓存命中）时返回序列化结果
+    """
+    spec = request.args.get('fields', '')
+    if spec:
+        tree = parse_fields_spec(spec)
+        if 'code' in data:
+            tree.setdefault('code', {})
+        return jsonify(project_fields(data, tree))
+    if body is not None and request.args.get('raw') == '1':
+        return Response(body, content_type='application/json; charset=utf-8')
+    return jsonify(data)
+
+
+def stream_upstream(url: str, endpoint: str, headers: Dict[str, str]) -> Response:
+    """把上游响应内容按块直接转发给客户端（不解析JSON）
+
+    Raises:
+        requests.RequestException: 上游请求失败
+    """
+    response = UPSTREAM.get(url, endpoint=endpoint, headers=headers, stream=True)
+    try:
+        response.raise_for_status()
+    except requests.RequestException:
+        response.close()
+        raise
+
+    def generate():
+        try:
+            # iter_content会自动解压gzip等编码，因此不转发Content-Encoding
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                yield chunk
+        finally:
+            response.close()
+
+    return Response(
+        stream_with_context(generate()),
+        status=response.status_code,
+        content_type=response.headers.get('Content-Type', 'application/json; charset=utf-8')
+    )
+
+
+def format_url_item(item: Dict) -> Union[Dict, None]:
+    """提取播放URL接口返回给前端的字段，没有可用URL时返回None"""
+    if not item or not item.get('url'):
+        return None
+    return {
+        "url": item['url'],
+        "br": item.get('br'),
+        "size": item.get('size'),
+        "level": item.get('level'),
+        "encodeType": item.get('encodeType')
+    }
+
+
+def parse_id_list(raw_ids) -> List[str]:
+    """解析逗号分隔（或列表形式）的歌曲ID，去重并保持顺序"""
+    if isinstance(raw_ids, (str, int)):
+        raw_ids = str(raw_ids).split(',')
+    return list(dict.fromkeys(str(song_id).strip() for song_id in raw_ids or [] if str(song_id).strip()))
+
 
 # ========== 接口路由 ==========
 
@@ -267,15 +1189,20 @@ def song_parse():
         return jsonify({'error': '无法解析歌曲ID'}), 400
 
     cookies = parse_cookie(read_cookie())
-    url_data = get_song_url(target_id, level, cookies)
+    # 详情和歌词只依赖歌曲ID，与播放URL同时请求，整体共用一个截止时间
+    deadline = time.monotonic() + PARSE_DEADLINE
+    url_future = submit_upstream(get_song_url, target_id, level, cookies)
+    detail_future = submit_upstream(get_song_detail, target_id)
+    lyric_future = submit_upstream(get_song_lyric, target_id, cookies)
 
+    url_data = wait_result(url_future, deadline, {"code": 504, "message": "获取播放URL超时"})
     if url_data.get('code') != 200:
         return jsonify({"status": 400, 'msg': url_data.get('message', '获取播放URL失败')}), 400
     data_list = url_data.get('data', [])
     if not data_list or not data_list[0].get('url'):
         return jsonify({"status": 400, 'msg': '信息获取不完整'}), 400
 
-    detail_data = get_song_detail(data_list[0]['id'])
+    detail_data = wait_result(detail_future, deadline, {"code": 504, "message": "获取歌曲详情超时"})
     if detail_data.get('code') != 200:
         return jsonify({"status": 400, 'msg': detail_data.get('message', '获取歌曲详情失败')}), 400
     songs = detail_data.get('songs', [])
@@ -283,7 +1210,7 @@ def song_parse():
         return jsonify({"status": 400, 'msg': '未找到歌曲信息'}), 400
     song = songs[0]
 
-    lyric_data = get_song_lyric(data_list[0]['id'], cookies)
+    lyric_data = wait_result(lyric_future, deadline, {})
     lyric = lyric_data.get('lrc', {}).get('lyric', '')
     tlyric = lyric_data.get('tlyric', {}).get('lyric', '')
 
@@ -335,49 +1262,203 @@ def search_song():
     page = request.args.get('page', 0, type=int)
     if page < 0:
         page = 0
-    offset = page * 50
+    query = normalize_search_query(name)
+
+    cache_key = (query, page)
+    cached = SEARCH_CACHE.get(cache_key)
+    if cached is not None:
+        # 缓存中只有解析后的结果，raw=1时返回其序列化结果
+        return upstream_json_response(cached)
 
     try:
-        encoded_name = urllib.parse.quote(name)
-        url = f'https://music.163.com/api/search/get?s={encoded_name}&type=1&limit=30&offset={offset}'
-        response = requests.get(url, headers=WEB_HEADERS, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.RequestException as e:
+        return upstream_json_response(*SINGLE_FLIGHT.do(('search',) + cache_key, _load_search, query, page))
+    except (requests.RequestException, ValueError) as e:
         current_app.logger.error(f"搜索失败：关键词={name}，页码={page}，错误={str(e)}")
         return jsonify({"code": 500, "message": f"搜索失败：{str(e)}"}), 500
 
+
+def _load_search(query: str, page: int) -> tuple:
+    """请求上游搜索接口，成功的结果写入搜索缓存（只缓存解析后的结果），返回(解析后的结果, 上游原始响应内容)"""
+    offset = page * 50
+    encoded_name = urllib.parse.quote(query)
+    url = f'https://music.163.com/api/search/get?s={encoded_name}&type=1&limit=30&offset={offset}'
+    response = UPSTREAM.get(url, endpoint='search', hedge=True, headers=WEB_HEADERS)
+    response.raise_for_status()
+    data = response.json()
+    if data.get('code') == 200:
+        SEARCH_CACHE.set((query, page), data)
+    return data, response.content
+
+def get_playlist_cookie_headers() -> Dict[str, str]:
+    """构建请求歌单接口所需的请求头（确保Cookie中包含os=pc）"""
+    headers_with_cookie = WEB_HEADERS.copy()
+    # 优先使用配置文件中的Cookie
+    netease_cookie = current_app.config.get('NETEASE_MUSIC_COOKIE', '').strip()
+    
+    # 确保os=pc被添加到cookie中
+    if netease_cookie:
+        # 如果配置文件中有cookie，检查是否已包含os=pc
+        # 分割cookie键值对，忽略大小写和空格
+        cookie_pairs = netease_cookie.lower().split(';')
+        has_os_pc = any(pair.strip().startswith('os=pc') for pair in cookie_pairs)
+        
+        if not has_os_pc:
+            # 如果没有，添加os=pc到cookie中
+            headers_with_cookie['Cookie'] = f'{netease_cookie}; os=pc'
+        else:
+            # 如果已有os=pc，直接使用配置文件中的cookie
+            headers_with_cookie['Cookie'] = netease_cookie
+    else:
+        # 如果没有配置Cookie，使用默认的os=pc
+        headers_with_cookie['Cookie'] = 'os=pc'
+        current_app.logger.warning("使用默认Cookie，部分功能可能受限")
+    return headers_with_cookie
+
+
+def fetch_playlist_detail(sid: int) -> Dict:
+    """请求上游歌单详情，并发的相同歌单请求只发出一次
+
+    Raises:
+        requests.RequestException: 上游请求失败
+    """
+    return SINGLE_FLIGHT.do(('playlist', sid), _load_playlist_detail, sid)
+
+
+def playlist_detail_url(sid: int) -> str:
+    return f'https://music.163.com/api/playlist/detail?id={sid}'
+
+
+def _load_playlist_detail(sid: int, priority: int = None) -> Dict:
+    response = UPSTREAM.get(
+        playlist_detail_url(sid), endpoint='playlist', hedge=True, priority=priority, headers=get_playlist_cookie_headers()
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _load_chart(sid: int) -> Dict:
+    """加载榜单快照，上游返回错误时抛出异常以保留上一份快照"""
+    result = _load_playlist_detail(sid, PRIORITY_BACKGROUND)
+    if result.get('code') != 200 or not result.get('result'):
+        raise ValueError(f"上游返回错误：{result.get('code')}")
+    return result
+
+
+def _load_hot_playlists() -> List[Dict]:
+    """加载热门歌单快照，上游未返回歌单时抛出异常以保留上一份快照"""
+    params = {
+        'cat': '全部',
+        'order': 'hot',
+        'limit': 100,
+        'offset': 0
+    }
+    resp = UPSTREAM.get(
+        'https://music.163.com/api/playlist/list',
+        endpoint='hot_playlists',
+        params=params,
+        headers=WEB_HEADERS
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    playlists = data.get('result', {}).get('playlists') or data.get('playlists') or []
+    if not playlists:
+        raise ValueError("上游未返回热门歌单")
+    return playlists
+
+
+# ========== 数据快照 ==========
+HOT_PLAYLISTS_SNAPSHOT = Snapshot('hot_playlists', _load_hot_playlists, SNAPSHOT_REFRESH_INTERVAL * 2)
+CHART_SNAPSHOTS = {
+    int(sid): Snapshot(f'chart_{sid}', lambda sid=int(sid): _load_chart(sid), SNAPSHOT_REFRESH_INTERVAL * 2)
+    for sid in CHART_PLAYLIST_IDS
+}
+
+
+def read_snapshot(snapshot: Snapshot):
+    """读取快照：还没有数据时同步加载；数据过期时先返回旧数据并在后台刷新"""
+    if snapshot.value is None:
+        if not snapshot.load():
+            raise requests.RequestException(snapshot.last_error or "加载失败")
+    elif snapshot.is_stale():
+        submit_background(snapshot.refresh)
+    return snapshot.value
+
+
+def refresh_snapshots():
+    """刷新所有快照（由定时任务调用，需要在应用上下文中执行）"""
+    for snapshot in [HOT_PLAYLISTS_SNAPSHOT] + list(CHART_SNAPSHOTS.values()):
+        if not snapshot.refresh() and snapshot.last_error:
+            current_app.logger.warning(f"快照刷新失败，继续使用旧数据：{snapshot.name}，错误：{snapshot.last_error}")
+
+
+def to_legacy_track(song: Dict) -> Dict:
+    """把歌曲详情接口（v3）的歌曲信息转换为歌单详情接口中tracks的格式"""
+    album = song.get('al') or {}
+    return {
+        'id': song.get('id'),
+        'name': song.get('name'),
+        'artists': [{'id': ar.get('id'), 'name': ar.get('name')} for ar in song.get('ar') or []],
+        'album': {'id': album.get('id'), 'name': album.get('name'), 'picUrl': album.get('picUrl')},
+        'duration': song.get('dt', 0),
+        'alias': song.get('alia') or [],
+        'fee': song.get('fee'),
+    }
+
+
+def resolve_playlist_tracks(result: Dict, offset: int = 0, limit: int = None) -> Dict:
+    """按trackIds补全歌单的全部歌曲，并按offset/limit分页
+
+    歌单详情接口只返回前一部分歌曲的完整信息，其余歌曲只在trackIds中。
+    只为当前页中缺少信息的歌曲批量请求歌曲详情（分块并发，带缓存）。
+
+    Returns:
+        新的歌单详情字典（不修改传入的数据），result.tracks为当前页歌曲，并附带total/offset/more
+    """
+    playlist = result.get('result') or {}
+    tracks = playlist.get('tracks') or []
+    track_ids = [item['id'] for item in playlist.get('trackIds') or [] if item and 'id' in item]
+    if not track_ids:
+        track_ids = [track['id'] for track in tracks if track and 'id' in track]
+
+    page_ids = track_ids[offset:offset + limit] if limit and limit > 0 else track_ids[offset:]
+    known = {track['id']: track for track in tracks if track and 'id' in track}
+    missing = [song_id for song_id in page_ids if song_id not in known]
+    if missing:
+        detail = get_songs_detail_bulk(missing)
+        for song in detail.get('songs') or []:
+            known[song['id']] = to_legacy_track(song)
+
+    merged = dict(result)
+    merged['result'] = dict(playlist, tracks=[known[song_id] for song_id in page_ids if song_id in known])
+    merged.update({
+        'total': len(track_ids),
+        'offset': offset,
+        'more': offset + len(page_ids) < len(track_ids)
+    })
+    return merged
+
+
 # 获取歌单详情接口
 @music.route('/playlist/<int:sid>')
 def get_playlist(sid: int):
+    """
+    获取歌单详情
+    参数: full (为1时按trackIds补全全部歌曲), offset/limit (full=1时对歌曲分页，默认返回全部),
+          fields (只返回指定路径的字段), raw (为1时直接转发上游原始响应)
+    """
+    full = request.args.get('full') == '1'
     try:
-        # 添加更多参数以获取完整歌曲列表
-        url = f'https://music.163.com/api/playlist/detail?id={sid}'
-        # 添加Cookie参数
-        headers_with_cookie = WEB_HEADERS.copy()
-        # 优先使用配置文件中的Cookie
-        netease_cookie = current_app.config.get('NETEASE_MUSIC_COOKIE', '').strip()
-        
-        # 确保os=pc被添加到cookie中
-        if netease_cookie:
-            # 如果配置文件中有cookie，检查是否已包含os=pc
-            # 分割cookie键值对，忽略大小写和空格
-            cookie_pairs = netease_cookie.lower().split(';')
-            has_os_pc = any(pair.strip().startswith('os=pc') for pair in cookie_pairs)
-            
-            if not has_os_pc:
-                # 如果没有，添加os=pc到cookie中
-                headers_with_cookie['Cookie'] = f'{netease_cookie}; os=pc'
-            else:
-                # 如果已有os=pc，直接使用配置文件中的cookie
-                headers_with_cookie['Cookie'] = netease_cookie
+        if sid in CHART_SNAPSHOTS:
+            result = read_snapshot(CHART_SNAPSHOTS[sid])
+        elif request.args.get('raw') == '1' and not full and not request.args.get('fields'):
+            return stream_upstream(playlist_detail_url(sid), 'playlist', get_playlist_cookie_headers())
         else:
-            # 如果没有配置Cookie，使用默认的os=pc
-            headers_with_cookie['Cookie'] = 'os=pc'
-            current_app.logger.warning("使用默认Cookie，部分功能可能受限")
-        response = requests.get(url, headers=headers_with_cookie, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
+            result = fetch_playlist_detail(sid)
+        if full and result.get('code') == 200:
+            offset = max(0, request.args.get('offset', 0, type=int))
+            limit = request.args.get('limit', type=int)
+            result = resolve_playlist_tracks(result, offset, limit)
+        return upstream_json_response(result)
     except requests.RequestException as e:
         current_app.logger.error(f"获取歌单失败：ID={sid}，错误={str(e)}")
         return jsonify({
@@ -385,15 +1466,84 @@ def get_playlist(sid: int):
             "message": f"获取歌单失败：{str(e)}"
         }), 500
 
+def fetch_user_playlists(uid: int) -> List[Dict]:
+    """获取网易云用户的全部歌单（带缓存），并发的相同请求只发出一次
+
+    Raises:
+        requests.RequestException: 上游请求失败
+        ValueError: 上游返回错误
+    """
+    cached = USER_PLAYLIST_CACHE.get(uid)
+    if cached is not None:
+        return cached
+    return SINGLE_FLIGHT.do(('user_playlist', uid), _load_user_playlists, uid)
+
+
+def _user_playlist_params(uid: int, offset: int) -> Dict[str, str]:
+    return {'offset': str(offset), 'limit': str(USER_PLAYLIST_PAGE_SIZE), 'uid': str(uid)}
+
+
+def _load_user_playlists(uid: int) -> List[Dict]:
+    """分页读取用户的全部歌单
+
+    上游只返回是否还有下一页（more），不返回总数，
+    因此第一页之后每轮并发请求USER_PLAYLIST_PAGE_CONCURRENCY页，直到某一页没有更多数据
+    """
+    response = UPSTREAM.get(
+        USER_PLAYLIST_URL, endpoint='user_playlist', params=_user_playlist_params(uid, 0), headers=WEB_HEADERS
+    )
+    response.raise_for_status()
+    page = response.json()
+    if page.get('code') != 200:
+        raise ValueError(f"上游返回错误：{page.get('code')}")
+    playlists = list(page.get('playlist') or [])
+    more = bool(page.get('more') and playlists)
+
+    offset = USER_PLAYLIST_PAGE_SIZE
+    while more:
+        offsets = [offset + i * USER_PLAYLIST_PAGE_SIZE for i in range(USER_PLAYLIST_PAGE_CONCURRENCY)]
+        pages = UPSTREAM.fetch_many('GET', 'user_playlist', [
+            (USER_PLAYLIST_URL, {'params': _user_playlist_params(uid, page_offset), 'headers': WEB_HEADERS})
+            for page_offset in offsets
+        ])
+        for page in pages:
+            # 任意一页失败都不缓存不完整的结果
+            if isinstance(page, Exception):
+                raise page
+            if page.get('code') != 200:
+                raise ValueError(f"上游返回错误：{page.get('code')}")
+            items = page.get('playlist') or []
+            playlists.extend(items)
+            more = bool(page.get('more') and items)
+            if not more:
+                break
+        offset += USER_PLAYLIST_PAGE_CONCURRENCY * USER_PLAYLIST_PAGE_SIZE
+
+    # 分页期间歌单有增减时可能出现重复，按歌单ID去重
+    playlists = list({playlist.get('id'): playlist for playlist in playlists}.values())
+    USER_PLAYLIST_CACHE.set(uid, playlists)
+    return playlists
+
+
 # 获取网易云用户歌单接口
 @music.route('/userlist/<int:uid>')
 def userlist(uid: int):
+    """
+    获取网易云用户的全部歌单
+    参数: offset (起始位置，默认0), limit (返回数量，默认返回全部), fields (只返回指定路径的字段)
+    """
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', type=int)
     try:
-        url = f'https://music.163.com/api/user/playlist/?offset=0&limit=100&uid={uid}'
-        response = requests.get(url, headers=WEB_HEADERS, timeout=10)
-        response.raise_for_status()
-        return jsonify(response.json())
-    except requests.RequestException as e:
+        playlists = fetch_user_playlists(uid)
+        selected = playlists[offset:offset + limit] if limit and limit > 0 else playlists[offset:]
+        return upstream_json_response({
+            "code": 200,
+            "playlist": selected,
+            "total": len(playlists),
+            "more": offset + len(selected) < len(playlists)
+        })
+    except (requests.RequestException, ValueError) as e:
         current_app.logger.error(f"获取用户歌单失败：UID={uid}，错误={str(e)}")
         return jsonify({
             "code": 500,
@@ -484,32 +1634,193 @@ def song_cover(song_id: int):
             "data": {"picUrl": "https://picsum.photos/56/56?random=1"}
         })
 
+# 批量获取歌曲信息接口
+@music.route('/song/batch', methods=['GET', 'POST'])
+def song_batch():
+    """
+    批量获取多首歌曲的信息，返回以歌曲ID为key的字典
+    参数: ids (逗号分隔的歌曲ID), fields (逗号分隔的字段：cover,name,artist,album,duration,url,lyric),
+          level (url字段使用的音质，默认使用配置的音质)
+    """
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        raw_ids = data.get('ids', '')
+        raw_fields = data.get('fields', '')
+        level = data.get('level')
+    else:
+        raw_ids = request.values.get('ids', '')
+        raw_fields = request.values.get('fields', '')
+        level = request.values.get('level')
+
+    if isinstance(raw_fields, str):
+        raw_fields = raw_fields.split(',')
+    song_ids = parse_id_list(raw_ids)
+    fields = [field.strip() for field in raw_fields if field.strip()] or list(BATCH_DETAIL_FIELDS)
+    level = level or current_app.config.get('DEFAULT_MUSIC_QUALITY', 'standard')
+
+    if not song_ids:
+        return jsonify({"code": 400, "message": "ids参数不能为空"}), 400
+    if len(song_ids) > BATCH_MAX_IDS:
+        return jsonify({"code": 400, "message": f"单次最多查询{BATCH_MAX_IDS}首歌曲"}), 400
+    if not all(song_id.isdigit() for song_id in song_ids):
+        return jsonify({"code": 400, "message": "歌曲ID格式错误"}), 400
+    invalid_fields = [field for field in fields if field not in BATCH_FIELDS]
+    if invalid_fields:
+        return jsonify({"code": 400, "message": f"不支持的字段：{','.join(invalid_fields)}"}), 400
+
+    try:
+        cookies = parse_cookie(read_cookie())
+        deadline = time.monotonic() + PARSE_DEADLINE
+        # 播放URL合并为一次批量请求，与详情请求并发进行
+        url_future = submit_upstream(get_songs_url, song_ids, level, cookies) if 'url' in fields else None
+        # 歌词没有批量接口，由一个线程通过asyncio客户端并发请求
+        lyric_future = submit_upstream(get_songs_lyric, song_ids, cookies) if 'lyric' in fields else None
+
+        # 详情字段只需一次批量请求（缓存命中的歌曲不会请求上游）
+        details = {}
+        if any(field in BATCH_DETAIL_FIELDS for field in fields):
+            detail_data = get_songs_detail(song_ids)
+            details = {str(song['id']): song for song in detail_data.get('songs') or []}
+
+        url_items = {}
+        if url_future is not None:
+            url_data = wait_result(url_future, deadline, {})
+            url_items = {str(url_item['id']): url_item for url_item in url_data.get('data') or []}
+        lyrics = wait_result(lyric_future, deadline, {}) if lyric_future is not None else {}
+
+        result = {}
+        for song_id in song_ids:
+            item = {}
+            song = details.get(song_id)
+            if song:
+                album = song.get('al') or {}
+                detail_values = {
+                    'cover': album.get('picUrl', ''),
+                    'name': song.get('name', '未知歌曲'),
+                    'artist': '/'.join([ar.get('name', '') for ar in song.get('ar', []) if ar.get('name')]),
+                    'album': album.get('name', '未知专辑'),
+                    'duration': song.get('dt', 0)
+                }
+                item.update({field: detail_values[field] for field in fields if field in detail_values})
+            else:
+                item.update({field: None for field in fields if field in BATCH_DETAIL_FIELDS})
+
+            if 'url' in fields:
+                item['url'] = format_url_item(url_items.get(song_id))
+
+            if 'lyric' in fields:
+                lyric_data = lyrics.get(song_id) or {}
+                lrc_text = lyric_data.get('lrc', {}).get('lyric', '') if isinstance(lyric_data.get('lrc'), dict) else ''
+                tlyric_text = lyric_data.get('tlyric', {}).get('lyric', '') if isinstance(lyric_data.get('tlyric'), dict) else ''
+                item['lyric'] = {"lrc": lrc_text, "tlyric": tlyric_text} if lrc_text or tlyric_text else None
+
+            result[song_id] = item
+
+        return jsonify({
+            "code": 200,
+            "data": result
+        })
+    except Exception as e:
+        current_app.logger.error(f"批量获取歌曲信息接口错误：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器内部错误: {str(e)}"
+        }), 500
+
+# 批量获取歌曲播放URL接口
+@music.route('/song/urls', methods=['GET', 'POST'])
+def song_urls():
+    """
+    一次EAPI请求获取多首歌曲的播放URL，返回以歌曲ID为key的字典（无可用URL的歌曲为null）
+    参数: ids (逗号分隔的歌曲ID), level (音质，默认使用配置的音质)
+    """
+    data = (request.get_json(silent=True) or {}) if request.is_json else request.values
+    song_ids = parse_id_list(data.get('ids', ''))
+    level = data.get('level') or current_app.config.get('DEFAULT_MUSIC_QUALITY', 'standard')
+
+    if not song_ids:
+        return jsonify({"code": 400, "message": "ids参数不能为空"}), 400
+    if len(song_ids) > BATCH_MAX_IDS:
+        return jsonify({"code": 400, "message": f"单次最多查询{BATCH_MAX_IDS}首歌曲"}), 400
+    if not all(song_id.isdigit() for song_id in song_ids):
+        return jsonify({"code": 400, "message": "歌曲ID格式错误"}), 400
+
+    try:
+        url_data = get_songs_url(song_ids, level, parse_cookie(read_cookie()))
+        if url_data.get('code') != 200:
+            return jsonify({"code": 500, "message": url_data.get('message', '获取播放URL失败')}), 500
+        items = {str(item['id']): item for item in url_data.get('data') or []}
+        return jsonify({
+            "code": 200,
+            "data": {song_id: format_url_item(items.get(song_id)) for song_id in song_ids}
+        })
+    except Exception as e:
+        current_app.logger.error(f"批量获取歌曲URL接口错误：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器内部错误: {str(e)}"
+        }), 500
+
+# 预取播放队列接口
+@music.route('/song/prefetch', methods=['POST'])
+def song_prefetch():
+    """
+    在后台提前获取即将播放歌曲的播放URL并写入缓存，立即返回
+    参数: ids (逗号分隔的歌曲ID，最多PREFETCH_MAX_IDS首), level (音质，默认使用配置的音质)
+    """
+    data = (request.get_json(silent=True) or {}) if request.is_json else request.values
+    song_ids = [song_id for song_id in parse_id_list(data.get('ids', '')) if song_id.isdigit()][:PREFETCH_MAX_IDS]
+    level = data.get('level') or current_app.config.get('DEFAULT_MUSIC_QUALITY', 'standard')
+
+    if not song_ids:
+        return jsonify({"code": 400, "message": "ids参数不能为空"}), 400
+
+    cached, missing = SONG_URL_CACHE.get_many([(song_id, level) for song_id in song_ids])
+    queued = 0
+    # 后台任务积压时直接放弃预取，不再继续排队
+    if missing and background_pending() < PREFETCH_MAX_PENDING:
+        # 推测性请求使用后台优先级，令牌紧张时让位于真正的播放请求（可能被丢弃）
+        submit_background(
+            get_songs_url, [cache_key[0] for cache_key in missing], level, parse_cookie(read_cookie()), PRIORITY_BACKGROUND
+        )
+        queued = len(missing)
+    return jsonify({
+        "code": 200,
+        "data": {"cached": len(cached), "queued": queued}
+    })
+
 # 获取热门歌单接口
 @music.route('/hot_playlists')
 def hot_playlists():
     try:
-        params = {
-            'cat': '全部',
-            'order': 'hot',
-            'limit': 100,
-            'offset': 0
-        }
-        resp = requests.get(
-            'https://music.163.com/api/playlist/list',
-            params=params,
-            headers=WEB_HEADERS,
-            timeout=10
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        playlists = data.get('result', {}).get('playlists') or data.get('playlists') or []
         return jsonify({
             "code": 200,
-            "playlists": playlists
+            "playlists": read_snapshot(HOT_PLAYLISTS_SNAPSHOT)
         })
     except Exception as e:
         current_app.logger.error(f"获取热门歌单错误：{str(e)}")
         return jsonify({
             "code": 500,
             "message": f"服务器内部错误: {str(e)}"
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+# 上游连接池与缓存统计接口（仅管理员可见）
+@music.route('/stats')
+@admin_required
+def upstream_stats():
+    return jsonify({
+        "code": 200,
+        "msg": "获取上游统计成功",
+        "data": {
+            "upstream": UPSTREAM.stats(),
+            "song_detail_cache": SONG_DETAIL_CACHE.stats(),
+            "song_url_cache": SONG_URL_CACHE.stats(),
+            "search_cache": SEARCH_CACHE.stats(),
+            "user_playlist_cache": USER_PLAYLIST_CACHE.stats(),
+            "negative_cache": NEGATIVE_CACHE.stats(),
+            "lyric_store": LYRIC_STORE.stats(),
+            "single_flight": SINGLE_FLIGHT.stats(),
+            "snapshots": [snapshot.stats() for snapshot in [HOT_PLAYLISTS_SNAPSHOT] + list(CHART_SNAPSHOTS.values())]
+        }
+    })
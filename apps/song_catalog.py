@@ -0,0 +1,144 @@
+"""
+本地歌曲信息表（song）
+
+网易云歌曲元数据的写透缓存：每次从上游获取到歌曲详情时写入song表，
+播放历史、歌单等页面直接LEFT JOIN song表补全歌曲信息，只有本地没有的歌曲才同步请求上游，
+过期的歌曲在后台刷新。
+"""
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import pymysql
+
+from config import current_config
+from apps.tool.Mysql import Mysql, connect_args
+
+logger = logging.getLogger(__name__)
+
+# 歌曲信息过期时间（秒），过期后在后台重新获取
+SONG_CATALOG_TTL = getattr(current_config, 'SONG_CATALOG_TTL', 7 * 24 * 3600)
+# 单条INSERT语句写入的最大歌曲数
+SAVE_BATCH_SIZE = 200
+
+# 写入song表的线程池，不占用请求线程和上游请求线程
+CATALOG_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='song-catalog')
+
+# 与database_schema.sql中的定义一致，已有数据库升级后第一次启动时创建
+CREATE_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS song ("
+    "id BIGINT NOT NULL PRIMARY KEY, "
+    "name VARCHAR(255) NOT NULL, "
+    "artists VARCHAR(500) NULL, "
+    "album VARCHAR(255) NULL, "
+    "cover_url VARCHAR(500) NULL, "
+    "duration INT NULL, "
+    "last_refreshed DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, "
+    "INDEX idx_song_last_refreshed (last_refreshed))"
+)
+
+UPSERT_SQL = (
+    "INSERT INTO song (id, name, artists, album, cover_url, duration, last_refreshed) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE name = VALUES(name), artists = VALUES(artists), album = VALUES(album), "
+    "cover_url = VALUES(cover_url), duration = VALUES(duration), last_refreshed = VALUES(last_refreshed)"
+)
+
+
+def ensure_song_table():
+    """创建song表（已存在时不做任何操作）
+
+    在应用启动时调用（可能在fork之前），使用临时连接，用完立即关闭，不提前创建连接池
+    """
+    conn = pymysql.connect(**connect_args())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_SQL)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def song_row(song: Dict) -> tuple:
+    """把上游返回的歌曲详情转换为song表的一行"""
+    album = song.get('al') or {}
+    return (
+        int(song['id']),
+        (song.get('name') or '')[:255],
+        '/'.join([ar.get('name', '') for ar in song.get('ar') or [] if ar.get('name')])[:500],
+        (album.get('name') or '')[:255],
+        (album.get('picUrl') or '')[:500],
+        song.get('dt') or 0,
+    )
+
+
+def save_songs(songs: List[Dict]):
+    """写入（或更新）歌曲信息"""
+    rows = [song_row(song) for song in songs if song and song.get('id')]
+    if not rows:
+        return
+    now = datetime.datetime.now()
+    try:
+        with Mysql() as db:
+            db.update_many(UPSERT_SQL, [row + (now,) for row in rows], chunk_size=SAVE_BATCH_SIZE)
+    except Exception as e:
+        logger.error(f"写入歌曲信息失败：{str(e)}")
+
+
+def save_songs_async(songs: List[Dict]):
+    """在后台写入歌曲信息，不阻塞调用方"""
+    if songs:
+        CATALOG_EXECUTOR.submit(save_songs, list(songs))
+
+
+def resolve_song_infos(rows: List[Dict]) -> Dict[int, Dict]:
+    """根据LEFT JOIN song表查询出的记录补全歌曲信息
+
+    rows中每条记录需包含song_id以及song表的name、artists、album、cover_url、last_refreshed字段。
+    本地没有的歌曲同步从上游获取（并写入song表），已过期的歌曲先使用本地数据并在后台刷新。
+
+    Args:
+        rows: 查询结果列表
+
+    Returns:
+        {歌曲ID: {'name', 'artist', 'cover_url', 'album'}}，上游也获取失败的歌曲不包含在内
+    """
+    from apps.music import get_songs_detail_bulk, refresh_songs_detail
+
+    infos = {}
+    missing, stale = [], []
+    stale_before = datetime.datetime.now() - datetime.timedelta(seconds=SONG_CATALOG_TTL)
+    for row in rows:
+        song_id = row['song_id']
+        if song_id in infos:
+            continue
+        if row.get('name') is None:
+            missing.append(song_id)
+            continue
+        infos[song_id] = {
+            'name': row['name'] or '未知歌曲',
+            'artist': row.get('artists') or '',
+            'cover_url': row.get('cover_url') or '',
+            'album': row.get('album') or '未知专辑'
+        }
+        if row.get('last_refreshed') is None or row['last_refreshed'] < stale_before:
+            stale.append(song_id)
+
+    missing = list(dict.fromkeys(missing))
+    if missing:
+        result = get_songs_detail_bulk(missing)
+        if result.get('code') == 200:
+            for song in result.get('songs') or []:
+                if song and 'id' in song:
+                    _, name, artists, album, cover_url, _ = song_row(song)
+                    infos[song['id']] = {
+                        'name': name or '未知歌曲',
+                        'artist': artists,
+                        'cover_url': cover_url,
+                        'album': album or '未知专辑'
+                    }
+
+    if stale:
+        refresh_songs_detail(stale)
+    return infos
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import aiohttp
+
+
+class AsyncHttpClient(object):
+    """基于asyncio的HTTP客户端，供同步代码批量并发请求使用
+
+    - 在一个后台线程中运行事件循环，所有请求共用一个ClientSession（HTTP/1.1 keep-alive）
+    - 使用信号量限制同时进行的请求数，连接数同样受limit限制
+    - 同步代码调用fetch_many，一个线程即可等待任意数量的并发请求
+    - 事件循环在第一次使用时才创建，避免在fork之前启动线程
+    - 域名解析结果由aiohttp按dns_cache_ttl秒缓存
+    """
+
+    def __init__(self, concurrency=20, limit_per_host=20, keepalive_timeout=30, dns_cache_ttl=60):
+        self.concurrency = concurrency
+        self.dns_cache_ttl = dns_cache_ttl
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='async-upstream', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._init_session(), loop).result()
+            self._loop = loop
+            return loop
+
+    async def _init_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        # 不保存上游下发的Cookie，每个请求只携带自己传入的Cookie
+        self._session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _fetch(self, method, url, timeout, kwargs):
+        async with self._semaphore:
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                async with self._session.request(method, url, timeout=timeout, **kwargs) as response:
+                    body = await response.read()
+                    self.completed += 1
+                    return response.status, body, time.perf_counter() - start
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def _fetch_all(self, calls, timeout):
+        return await asyncio.gather(
+            *[self._fetch(method, url, timeout, kwargs) for method, url, kwargs in calls],
+            return_exceptions=True
+        )
+
+    def fetch_many(self, calls, connect_timeout=3, read_timeout=10):
+        """并发执行多个请求并等待全部完成
+
+        Args:
+            calls: [(method, url, kwargs)]，kwargs为aiohttp请求参数（data、params、headers、cookies等）
+            connect_timeout: 连接超时（秒）
+            read_timeout: 读取超时（秒）
+
+        Returns:
+            与calls顺序一致的列表，每项为(状态码, 响应内容bytes, 耗时秒数)或请求抛出的异常
+        """
+        if not calls:
+            return []
+        loop = self._ensure_loop()
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        return asyncio.run_coroutine_threadsafe(self._fetch_all(calls, timeout), loop).result()
+
+    def stats(self):
+        return {
+            'started': self._loop is not None,
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'failed': self.failed
+        }
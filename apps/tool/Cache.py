@@ -0,0 +1,241 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """带过期时间的LRU缓存（线程安全）
+
+    - 容量达到上限时淘汰最久未被访问的条目
+    - 每个条目都有过期时间，过期后视为未命中
+    """
+
+    def __init__(self, maxsize=1000, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (过期时间戳, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_locked(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        expire_at, value = item
+        if expire_at <= now:
+            del self._data[key]
+            return False, None
+        # 命中后移动到末尾，标记为最近使用
+        self._data.move_to_end(key)
+        return True, value
+
+    def _set_locked(self, key, value, ttl, now):
+        self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._get_locked(key, time.time())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set_locked(key, value, ttl, time.time())
+
+    def get_many(self, keys):
+        """批量查询
+
+        Returns:
+            (命中的 {key: value}, 未命中的key列表)，未命中列表保持传入顺序
+        """
+        found, missing = {}, []
+        with self._lock:
+            now = time.time()
+            for key in keys:
+                ok, value = self._get_locked(key, now)
+                if ok:
+                    found[key] = value
+                else:
+                    missing.append(key)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, items, ttl=None):
+        with self._lock:
+            now = time.time()
+            for key, value in items.items():
+                self._set_locked(key, value, ttl, now)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+class _Call(object):
+    """SingleFlight中一次正在进行的调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """合并并发的相同调用（线程安全）
+
+    同一个key同一时刻只有一个调用真正执行，其余并发调用等待它完成并共享结果或异常。
+    key为元组时，第一个元素作为统计分类。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.deduplicated = 0
+        self._deduplicated_by_kind = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.deduplicated += 1
+                kind = key[0] if isinstance(key, tuple) and key else key
+                self._deduplicated_by_kind[kind] = self._deduplicated_by_kind.get(kind, 0) + 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'deduplicated': self.deduplicated,
+                'deduplicated_by_kind': dict(self._deduplicated_by_kind)
+            }
+
+
+class Snapshot(object):
+    """后台定时刷新的数据快照（stale-while-revalidate）
+
+    - 读取时立即返回最近一次成功加载的数据，不等待上游
+    - 刷新失败时保留上一份数据，上游故障期间继续提供旧数据
+    - 同一时刻只有一个刷新在进行，还没有数据的读取方等待进行中的刷新完成
+    """
+
+    def __init__(self, name, loader, max_age):
+        self.name = name
+        self.loader = loader
+        self.max_age = max_age
+        self.value = None
+        self.updated_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._refreshing = False
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+
+    def is_stale(self):
+        return time.time() - self.updated_at > self.max_age
+
+    def refresh(self):
+        """调用loader重新加载数据，成功返回True；loader抛出异常或已有刷新在进行时返回False"""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        success = False
+        error = None
+        try:
+            value = self.loader()
+            success = True
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                if success:
+                    self.value = value
+                    self.updated_at = time.time()
+                    self.refreshes += 1
+                    self.last_error = None
+                elif error is not None:
+                    self.failures += 1
+                    self.last_error = str(error)
+                self._refreshing = False
+                self._refreshed.notify_all()
+        return success
+
+    def load(self, timeout=None):
+        """同步加载（供还没有数据的读取方调用），已有刷新在进行时等待其完成而不是直接失败
+
+        Returns:
+            加载后是否有数据
+        """
+        if self.refresh():
+            return True
+        with self._lock:
+            self._refreshed.wait_for(lambda: not self._refreshing, timeout)
+            return self.value is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'loaded': self.value is not None,
+                'age': round(time.time() - self.updated_at, 1) if self.updated_at else None,
+                'max_age': self.max_age,
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker(object):
+    """熔断器（线程安全）
+
+    - closed：正常放行，统计最近window_size次调用的失败率和耗时
+    - open：失败率超过阈值后熔断，open_seconds内直接拒绝调用
+    - half_open：熔断时间结束后只放行一个探测调用，成功则恢复，失败则继续熔断
+    - 耗时分位数包含成功调用和超时调用（超时调用按超时时间计），上游整体变慢时分位数随之升高
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, error_rate=0.5, min_requests=10, open_seconds=30, window_size=50):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self._calls = deque(maxlen=window_size)  # (是否成功, 耗时秒数, 是否超时)
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._last_timed_out = False
+        self.opened_count = 0
+        self.rejected = 0
+
+    def allow(self):
+        """是否放行本次调用"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def cancel(self):
+        """放行后调用没有真正发出（如限速取令牌失败）时调用，释放半开状态的探测名额"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def record(self, success, elapsed, timed_out=False):
+        """记录一次调用结果，超时的调用elapsed传入使用的超时时间"""
+        with self._lock:
+            self._last_timed_out = timed_out
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                    self._calls.append((success, elapsed, timed_out))
+                else:
+                    # 探测失败的耗时也计入窗口，超时时分位数随之升高
+                    self._calls.append((success, elapsed, timed_out))
+                    self._open_locked()
+                return
+            self._calls.append((success, elapsed, timed_out))
+            if self.state == self.CLOSED and len(self._calls) >= self.min_requests:
+                failures = sum(1 for ok, _, _ in self._calls if not ok)
+                if failures / len(self._calls) >= self.error_rate:
+                    self._open_locked()
+
+    def _open_locked(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.opened_count += 1
+
+    def wants_full_timeout(self):
+        """半开探测以及上一次调用超时之后，应使用完整的配置超时而不是自适应超时"""
+        with self._lock:
+            return self.state != self.CLOSED or self._last_timed_out
+
+    def percentile(self, percent):
+        """成功和超时调用耗时的百分位数（秒），样本不足时返回None"""
+        with self._lock:
+            latencies = sorted(elapsed for ok, elapsed, timed_out in self._calls if ok or timed_out)
+        if len(latencies) < self.min_requests:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * percent / 100))
+        return latencies[index]
+
+    def stats(self):
+        with self._lock:
+            total = len(self._calls)
+            failures = sum(1 for ok, _, _ in self._calls if not ok)
+            state = self.state
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)) if state == self.OPEN else 0.0
+        percentiles = {f'p{p}_ms': self.percentile(p) for p in (50, 95, 99)}
+        return {
+            'state': state,
+            'window': total,
+            'error_rate': round(failures / total, 4) if total else 0.0,
+            'opened_count': self.opened_count,
+            'rejected': self.rejected,
+            'retry_in': round(retry_in, 1),
+            **{name: round(value * 1000, 1) if value is not None else None for name, value in percentiles.items()}
+        }
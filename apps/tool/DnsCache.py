@@ -0,0 +1,92 @@
+import socket
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from apps.tool.Cache import TTLCache
+
+
+class DnsCache(object):
+    """DNS解析结果缓存（线程安全）
+
+    - 只供使用CachingHTTPAdapter的Session使用，不影响进程内其他代码的域名解析
+    - 系统解析接口不返回DNS记录的TTL，因此按固定的ttl秒过期；连接失败时立即作废该域名的缓存
+    """
+
+    def __init__(self, ttl=60, maxsize=128):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def resolve(self, host, port):
+        """返回host的IP地址列表（保持系统解析返回的顺序）"""
+        key = (host, port)
+        addresses = self._cache.get(key)
+        if addresses is None:
+            infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            self._cache.set(key, addresses)
+        return addresses
+
+    def invalidate(self, host, port):
+        self._cache.delete((host, port))
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def _new_conn_with_cache(conn, super_new_conn):
+    """依次尝试缓存中的IP地址建立连接，全部失败时作废缓存并抛出最后一个错误
+
+    TLS的SNI和证书校验使用conn.host，这里只替换实际连接的地址（_dns_host）
+    """
+    host = conn._dns_host
+    try:
+        addresses = conn.dns_cache.resolve(host, conn.port)
+    except OSError:
+        return super_new_conn()
+    error = None
+    try:
+        for address in addresses:
+            conn._dns_host = address
+            try:
+                return super_new_conn()
+            except Exception as e:
+                error = e
+    finally:
+        conn._dns_host = host
+    conn.dns_cache.invalidate(host, conn.port)
+    raise error
+
+
+class CachingHTTPConnection(HTTPConnection):
+    dns_cache = None
+
+    def _new_conn(self):
+        return _new_conn_with_cache(self, super()._new_conn)
+
+
+class CachingHTTPSConnection(HTTPSConnection):
+    dns_cache = None
+
+    def _new_conn(self):
+        return _new_conn_with_cache(self, super()._new_conn)
+
+
+class CachingHTTPAdapter(HTTPAdapter):
+    """建立新连接时使用DnsCache解析域名的HTTPAdapter"""
+
+    def __init__(self, dns_cache, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        dns_cache = self.dns_cache
+
+        class HTTPPool(HTTPConnectionPool):
+            ConnectionCls = type('HTTPConnection', (CachingHTTPConnection,), {'dns_cache': dns_cache})
+
+        class HTTPSPool(HTTPSConnectionPool):
+            ConnectionCls = type('HTTPSConnection', (CachingHTTPSConnection,), {'dns_cache': dns_cache})
+
+        self.poolmanager.pool_classes_by_scheme = {'http': HTTPPool, 'https': HTTPSPool}
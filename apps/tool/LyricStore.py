@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class LyricStore(object):
+    """基于SQLite的本地歌词持久化存储
+
+    - 歌曲ID作为INTEGER主键（即rowid），不额外维护主键索引
+    - 歌词JSON使用zlib压缩后存储
+    - 使用WAL模式，同一主机上的多个worker进程共享同一个数据库文件，重启后数据仍在
+    - 总大小超过上限时按最近访问时间淘汰
+    - 连接按线程和进程分别创建：SQLite连接不能跨fork使用，fork出的worker进程会重新连接
+    """
+    ACCESS_UPDATE_INTERVAL = 3600  # 访问时间的最小更新间隔（秒），避免每次读取都写库
+    EVICT_CHECK_INTERVAL = 100  # 每写入多少条检查一次容量
+    EVICT_BATCH_SIZE = 500  # 每轮淘汰的条目数
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        try:
+            self._init_db()
+        except (OSError, sqlite3.Error) as e:
+            self.enabled = False
+            logger.error(f"歌词存储初始化失败，已禁用：{str(e)}")
+
+    def _open(self):
+        # isolation_level=None：每条语句自动提交，读多写少场景下锁持有时间最短
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # fork前打开的连接不能在子进程中使用（也不能关闭），直接丢弃后重新连接
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._open()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_db(self):
+        store_dir = os.path.dirname(self.path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        # 初始化通常发生在导入模块时（可能在fork之前），使用临时连接，用完立即关闭
+        conn = self._open()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lyric ("
+                "song_id INTEGER PRIMARY KEY, "
+                "data BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "access_time INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lyric_access_time ON lyric (access_time)")
+        finally:
+            conn.close()
+
+    def get(self, song_id):
+        """读取歌词，不存在时返回None"""
+        if not self.enabled:
+            return None
+        try:
+            song_id = int(song_id)
+            conn = self._connect()
+            row = conn.execute("SELECT data, access_time FROM lyric WHERE song_id = ?", (song_id,)).fetchone()
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            now = int(time.time())
+            if now - row[1] > self.ACCESS_UPDATE_INTERVAL:
+                conn.execute("UPDATE lyric SET access_time = ? WHERE song_id = ?", (now, song_id))
+            with self._lock:
+                self.hits += 1
+            return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        except (ValueError, zlib.error, sqlite3.Error) as e:
+            logger.warning(f"读取歌词存储失败：{song_id}，错误：{str(e)}")
+            return None
+
+    def set(self, song_id, value):
+        """写入歌词（覆盖已有记录）"""
+        if not self.enabled:
+            return False
+        try:
+            data = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 9)
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO lyric (song_id, data, size, access_time) VALUES (?, ?, ?, ?)",
+                (int(song_id), sqlite3.Binary(data), len(data), int(time.time()))
+            )
+        except (ValueError, TypeError, sqlite3.Error) as e:
+            logger.warning(f"写入歌词存储失败：{song_id}，错误：{str(e)}")
+            return False
+
+        with self._lock:
+            self.writes += 1
+            self._writes_since_check += 1
+            need_check = self._writes_since_check >= self.EVICT_CHECK_INTERVAL
+            if need_check:
+                self._writes_since_check = 0
+        if need_check:
+            self.evict()
+        return True
+
+    def evict(self):
+        """总大小超过上限时，淘汰最久未访问的歌词直到降到上限的90%"""
+        if not self.enabled:
+            return 0
+        removed = 0
+        try:
+            conn = self._connect()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM lyric").fetchone()[0]
+            target = int(self.max_bytes * 0.9)
+            while total > self.max_bytes or (removed and total > target):
+                rows = conn.execute(
+                    "SELECT song_id, size FROM lyric ORDER BY access_time LIMIT ?",
+                    (self.EVICT_BATCH_SIZE,)
+                ).fetchall()
+                if not rows:
+                    break
+                # 只删除刚好足够降到目标大小的部分
+                freed = 0
+                for index, row in enumerate(rows):
+                    freed += row[1]
+                    if total - freed <= target:
+                        rows = rows[:index + 1]
+                        break
+                conn.execute(
+                    f"DELETE FROM lyric WHERE song_id IN ({','.join(['?'] * len(rows))})",
+                    [row[0] for row in rows]
+                )
+                total -= sum(row[1] for row in rows)
+                removed += len(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"歌词存储淘汰失败：{str(e)}")
+        if removed:
+            with self._lock:
+                self.evictions += removed
+            logger.info(f"歌词存储已淘汰{removed}条记录")
+        return removed
+
+    def stats(self):
+        result = {
+            'enabled': self.enabled,
+            'path': self.path,
+            'max_bytes': self.max_bytes,
+            'count': 0,
+            'bytes': 0,
+            'file_bytes': 0
+        }
+        if self.enabled:
+            try:
+                count, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM lyric").fetchone()
+                result['count'] = count
+                result['bytes'] = size
+                result['file_bytes'] = os.path.getsize(self.path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"读取歌词存储统计失败：{str(e)}")
+        with self._lock:
+            total = self.hits + self.misses
+            result.update({
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions
+            })
+        return result
@@ -1,38 +1,175 @@
+import logging
+import time
+from contextlib import contextmanager
+
 import pymysql
 from dbutils.pooled_db import PooledDB
+from flask import current_app, g, has_app_context, has_request_context, request
 from config import current_config
+from apps.tool.SqlStats import SqlStats, fingerprint
 
 
-# 创建全局连接池实例
+# 创建全局连接池实例（主库），配置了只读副本时另建副本连接池
 pool = None
+replica_pool = None
+
+logger = logging.getLogger(__name__)
+
+# SQL执行统计，按指纹和请求端点汇总
+SQL_STATS = SqlStats(
+    slow_threshold=getattr(current_config, 'SQL_SLOW_QUERY_MS', 200) / 1000.0,
+    repeat_threshold=getattr(current_config, 'SQL_REPEAT_THRESHOLD', 10)
+)
+
+
+def get_logger():
+    """在Flask应用上下文中使用应用日志，否则使用模块日志"""
+    return current_app.logger if has_app_context() else logger
+
+
+# 只读副本上次连接失败的时间，冷却期内查询直接发往主库，不再尝试连接副本
+_replica_failed_at = None
+REPLICA_RETRY_SECONDS = getattr(current_config, 'DB_REPLICA_RETRY_SECONDS', 30)
+# 副本连接超时（秒），副本不可达时尽快放弃，避免阻塞请求
+REPLICA_CONNECT_TIMEOUT = getattr(current_config, 'DB_REPLICA_CONNECT_TIMEOUT', 2)
+
+
+def replica_enabled():
+    return bool(getattr(current_config, 'DB_REPLICA_HOST', ''))
+
+
+def replica_ready():
+    """副本已配置且不在连接失败后的冷却期内"""
+    return replica_enabled() and (
+        _replica_failed_at is None or time.monotonic() - _replica_failed_at >= REPLICA_RETRY_SECONDS
+    )
+
+
+def mark_replica_failed(error):
+    """记录副本连接失败，冷却期内的查询都发往主库"""
+    global _replica_failed_at
+    _replica_failed_at = time.monotonic()
+    SQL_STATS.record_route('replica_fallback')
+    get_logger().warning(f"只读副本不可用，{REPLICA_RETRY_SECONDS}秒内查询改为发往主库: {error}")
+
+
+# 连接层错误码：无法连接、连接断开、查询中连接丢失、读包失败
+CONNECTION_ERROR_CODES = {2003, 2006, 2013, 2055}
+
+
+def is_connection_error(error):
+    """是否为连接层错误（只有这类错误才改在主库上重试，SQL错误等在主库上重试也不会成功）"""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and error.args[0] in CONNECTION_ERROR_CODES
+
+
+def connect_args(replica=False):
+    """数据库连接参数，replica为True时返回只读副本的连接参数（未单独配置的项沿用主库配置）"""
+    args = dict(
+        host=getattr(current_config, 'DB_HOST', 'localhost'),
+        user=getattr(current_config, 'DB_USER', 'root'),
+        password=getattr(current_config, 'DB_PASSWORD', '123456'),
+        database=getattr(current_config, 'DB_NAME', 'music'),
+        port=getattr(current_config, 'DB_PORT', 3306),
+        charset='utf8mb4'
+    )
+    if replica:
+        args.update(
+            host=getattr(current_config, 'DB_REPLICA_HOST', '') or args['host'],
+            user=getattr(current_config, 'DB_REPLICA_USER', '') or args['user'],
+            password=getattr(current_config, 'DB_REPLICA_PASSWORD', '') or args['password'],
+            port=getattr(current_config, 'DB_REPLICA_PORT', 0) or args['port'],
+            connect_timeout=REPLICA_CONNECT_TIMEOUT
+        )
+    return args
+
+
+def create_pool(replica=False):
+    return PooledDB(
+        creator=pymysql,  # 使用pymysql作为数据库连接模块
+        maxconnections=50,  # 连接池允许的最大连接数
+        mincached=5,  # 初始化时连接池的空闲连接数量
+        maxcached=20,  # 连接池中空闲连接的最大数量
+        maxshared=0,  # 连接池允许的最大共享连接数（0表示所有连接都是专用的）
+        blocking=True,  # 当没有可用连接时是否阻塞等待
+        maxusage=None,  # 单个连接的最大使用次数（None表示无限制）
+        setsession=[],  # 开始会话前执行的命令列表
+        ping=4,  # 检查连接是否有效的方式
+        cursorclass=pymysql.cursors.DictCursor,
+        **connect_args(replica)
+    )
 
 
 class Mysql:
-    def __init__(self):
-        global pool
+    """数据库操作封装
+
+    配置了只读副本（DB_REPLICA_HOST）时，查询默认发往副本，以下情况发往主库：
+    - 写语句（update、update_many）
+    - 事务中的查询
+    - 本实例执行过写语句之后的查询（读到自己刚写入的数据）
+    - 非GET/HEAD请求中的查询（写接口写入前的存在性、唯一性检查需要读到最新数据）
+    - force_primary=True创建的实例，或select(..., primary=True)
+    - 副本连接失败后的DB_REPLICA_RETRY_SECONDS秒内（查询在副本上因连接错误失败时会改在主库上重试）
+    主库和副本连接都在第一次使用时才从连接池获取。
+    """
+
+    def __init__(self, force_primary=False):
+        global pool, replica_pool
         if not pool:
             # 初始化连接池
-            pool = PooledDB(
-                creator=pymysql,  # 使用pymysql作为数据库连接模块
-                maxconnections=50,  # 连接池允许的最大连接数
-                mincached=5,  # 初始化时连接池的空闲连接数量
-                maxcached=20,  # 连接池中空闲连接的最大数量
-                maxshared=0,  # 连接池允许的最大共享连接数（0表示所有连接都是专用的）
-                blocking=True,  # 当没有可用连接时是否阻塞等待
-                maxusage=None,  # 单个连接的最大使用次数（None表示无限制）
-                setsession=[],  # 开始会话前执行的命令列表
-                ping=4,  # 检查连接是否有效的方式
-                host=getattr(current_config, 'DB_HOST', 'localhost'),
-                user=getattr(current_config, 'DB_USER', 'root'),
-                password=getattr(current_config, 'DB_PASSWORD', '123456'),
-                database=getattr(current_config, 'DB_NAME', 'music'),
-                port=getattr(current_config, 'DB_PORT', 3306),
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
-            )
-        
-        # 从连接池中获取一个连接
-        self.db = pool.connection()
+            pool = create_pool()
+        if not replica_pool and replica_ready():
+            try:
+                replica_pool = create_pool(replica=True)
+            except Exception as e:
+                # 冷却期过后才会再次尝试创建，期间的实例不再等待副本连接超时
+                mark_replica_failed(e)
+
+        self.force_primary = force_primary
+        self._db = None
+        self._replica = None
+        # 执行过写语句后，后续查询都发往主库
+        self._wrote = False
+        # 当前事务嵌套层数，0表示不在事务中（每条语句自动提交）
+        self._tx_depth = 0
+
+    @property
+    def db(self):
+        """主库连接"""
+        if self._db is None:
+            # 从连接池中获取一个连接
+            self._db = pool.connection()
+        return self._db
+
+    def _use_primary(self, primary=False):
+        """查询是否必须发往主库"""
+        if primary or self.force_primary or self._wrote or self.in_transaction:
+            return True
+        if not replica_pool or not replica_ready():
+            return True
+        return has_request_context() and request.method not in ('GET', 'HEAD')
+
+    def _read_connection(self, primary=False):
+        """查询使用的连接，返回(连接, 是否为副本)"""
+        if self._use_primary(primary):
+            return self.db, False
+        if self._replica is None:
+            try:
+                self._replica = replica_pool.connection()
+            except Exception as e:
+                mark_replica_failed(e)
+                return self.db, False
+        return self._replica, True
+
+    def _drop_replica(self):
+        """丢弃出错的副本连接"""
+        replica, self._replica = self._replica, None
+        if replica is not None:
+            try:
+                replica.close()
+            except Exception:
+                pass
 
     def __enter__(self):
         return self
@@ -40,43 +177,233 @@ class Mysql:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
+    @contextmanager
+    def transaction(self):
+        """事务上下文：块内的update/update_many只在块结束时统一提交一次
+
+        - 块内抛出异常时回滚并继续抛出；块内语句执行失败会直接抛出异常，而不是返回None
+        - 嵌套使用时内层使用SAVEPOINT，内层异常只回滚到内层开始的位置
+
+        用法:
+            with Mysql() as db:
+                with db.transaction():
+                    db.sql(...)
+                    db.sql(...)
+        """
+        depth = self._tx_depth
+        savepoint = f"sp_{depth}"
+        if depth == 0:
+            self.db.begin()
+        else:
+            self._execute_raw(f"SAVEPOINT {savepoint}")
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth = depth
+            if depth == 0:
+                self.db.rollback()
+            else:
+                self._execute_raw(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+        self._tx_depth = depth
+        if depth == 0:
+            self.db.commit()
+        else:
+            self._execute_raw(f"RELEASE SAVEPOINT {savepoint}")
+
+    def _record(self, sql, elapsed, rows, error=None):
+        """记录语句耗时、行数和指纹，慢查询和错误写入日志，请求内的语句记录到g.sql_queries"""
+        key = fingerprint(sql)
+        if SQL_STATS.record(key, sql, elapsed, rows, error is not None):
+            get_logger().warning(f"慢查询 {elapsed * 1000:.1f}ms 行数: {rows} | {sql[:500]}")
+        if error is not None:
+            get_logger().error(f"SQL执行失败: {error} | {sql[:500]}")
+        if has_request_context():
+            g.setdefault('sql_queries', []).append((key, elapsed))
+
+    @property
+    def in_transaction(self):
+        return self._tx_depth > 0
+
+    def _execute_raw(self, sql):
+        cursor = self.db.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
     def update(self, sql, param=()):
         sql = sql.strip()
         count = rowid = None
+        self._wrote = True
         cursor = self.db.cursor()
+        SQL_STATS.record_route('primary')
+        start = time.perf_counter()
         try:
             # 统一使用execute执行单条SQL语句
             count = cursor.execute(sql, param)
-            self.db.commit()
             rowid = cursor.lastrowid
+            # 事务中由transaction()统一提交
+            if not self.in_transaction:
+                self.db.commit()
+            self._record(sql, time.perf_counter() - start, count)
         except Exception as e:
-            print(e)
+            self._record(sql, time.perf_counter() - start, count, e)
+            if self.in_transaction:
+                raise
             self.db.rollback()
         finally:
             cursor.close()
         return count, rowid
 
-    def select(self, sql, param=(), limit=0):
+    def update_many(self, sql, params, chunk_size=500):
+        """批量执行同一条SQL语句，所有分块在同一个事务中提交
+
+        INSERT/REPLACE ... VALUES (...) 语句会被合并为多行VALUES发送（每块一条语句），
+        其他语句在同一事务内逐条执行，只提交一次。
+
+        Args:
+            sql: SQL语句，如 INSERT INTO t (a, b) VALUES (%s, %s)
+            params: 参数元组列表
+            chunk_size: 每块的参数数量
+
+        Returns:
+            每块的影响行数列表，执行失败（已回滚）时返回None；在transaction()中执行失败时抛出异常
+        """
         sql = sql.strip()
-        result = None
+        params = list(params)
+        counts = []
+        if not params:
+            return counts
+        self._wrote = True
         cursor = self.db.cursor()
+        SQL_STATS.record_route('primary')
+        start = time.perf_counter()
+        try:
+            for i in range(0, len(params), chunk_size):
+                counts.append(cursor.executemany(sql, params[i:i + chunk_size]))
+            if not self.in_transaction:
+                self.db.commit()
+            self._record(sql, time.perf_counter() - start, sum(counts))
+        except Exception as e:
+            self._record(sql, time.perf_counter() - start, sum(counts), e)
+            if self.in_transaction:
+                raise
+            self.db.rollback()
+            counts = None
+        finally:
+            cursor.close()
+        return counts
+
+    def select(self, sql, param=(), limit=0, primary=False):
+        sql = sql.strip()
+        conn, on_replica = self._read_connection(primary)
+        if on_replica:
+            try:
+                return self._fetch(conn, sql, param, limit, on_replica=True)
+            except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+                # 副本连接中断等连接层错误：丢弃副本连接，改在主库上重试
+                self._drop_replica()
+                mark_replica_failed(e)
+        return self._fetch(self.db, sql, param, limit)
+
+    def _fetch(self, conn, sql, param, limit, on_replica=False):
+        """执行查询，出错时返回None；副本上的连接错误会抛出，由select改在主库上重试"""
+        result = None
+        cursor = conn.cursor()
+        SQL_STATS.record_route('replica' if on_replica else 'primary')
+        start = time.perf_counter()
         try:
             cursor.execute(sql, param)
             result = cursor.fetchall() if limit == 0 else cursor.fetchmany(limit)
+            self._record(sql, time.perf_counter() - start, len(result))
         except Exception as e:
-            print(e)
+            self._record(sql, time.perf_counter() - start, None, e)
+            if on_replica and is_connection_error(e):
+                raise
         finally:
-            cursor.close()
+            try:
+                cursor.close()
+            except Exception:
+                pass
         return result
 
-    def sql(self, sql, param=(), limit=0):
+    def select_iter(self, sql, param=(), batch_size=0, as_tuple=False, primary=False):
+        """流式查询：使用服务端游标逐行读取，结果不会一次性加载到内存
+
+        查询在单独的数据库连接上执行（不占用连接池，也不影响当前连接上的其他语句），
+        遍历结束或调用方提前停止（break、异常、生成器被回收）时关闭该连接。
+        与select不同，查询出错时直接抛出异常，避免调用方把不完整的结果当成全部数据。
+
+        Args:
+            sql: 查询语句
+            param: 查询参数
+            batch_size: 大于0时每次产出一个最多batch_size行的列表，否则逐行产出
+            as_tuple: 为True时每行是元组，否则是字典
+            primary: 为True时在主库上查询（默认与select相同的路由规则）
+
+        Yields:
+            行或行列表
+        """
+        sql = sql.strip()
+        cursorclass = pymysql.cursors.SSCursor if as_tuple else pymysql.cursors.SSDictCursor
+        on_replica = not self._use_primary(primary)
+        try:
+            conn = pymysql.connect(cursorclass=cursorclass, **connect_args(on_replica))
+        except pymysql.err.OperationalError as e:
+            if not on_replica:
+                raise
+            mark_replica_failed(e)
+            on_replica = False
+            conn = pymysql.connect(cursorclass=cursorclass, **connect_args())
+        SQL_STATS.record_route('replica' if on_replica else 'primary')
+        start = time.perf_counter()
+        try:
+            cursor = conn.cursor()
+            # 调用方处理每批数据时不读取结果，放宽服务端写超时，避免长时间处理后连接被断开
+            cursor.execute(
+                "SET SESSION net_write_timeout = %s",
+                (getattr(current_config, 'DB_STREAM_WRITE_TIMEOUT', 3600),)
+            )
+            try:
+                cursor.execute(sql, param)
+            except Exception as e:
+                self._record(sql, time.perf_counter() - start, None, e)
+                raise
+            # 只统计执行耗时（不含调用方处理结果的时间），行数为实际读取的行数
+            elapsed = time.perf_counter() - start
+            rows_read = 0
+            try:
+                if batch_size > 0:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        rows_read += len(rows)
+                        yield rows
+                else:
+                    for row in cursor:
+                        rows_read += 1
+                        yield row
+            finally:
+                self._record(sql, elapsed, rows_read)
+            cursor.close()
+        finally:
+            # 提前停止时不关闭游标（关闭服务端游标会读完剩余的全部结果），直接断开连接
+            conn.close()
+
+    def sql(self, sql, param=(), limit=0, primary=False):
         sql = sql.strip().lower()  # 转换为小写
         # 使用更严格的判断条件
         if sql.lower().startswith("select"):
-            return self.select(sql, param, limit)
+            return self.select(sql, param, limit, primary)
         else:
             return self.update(sql, param)
 
     def close(self):
         # 将连接返回到连接池，而不是关闭它
-        self.db.close()
+        for conn in (self._db, self._replica):
+            if conn is not None:
+                conn.close()
+        self._db = self._replica = None
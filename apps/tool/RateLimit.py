@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """令牌桶（线程安全）
+
+    - 以rate个/秒的速度补充令牌，最多积累capacity个
+    - 取令牌时可以指定保留量：取走后剩余令牌不能低于reserve，
+      低优先级调用使用更高的保留量，令牌紧张时把余量留给高优先级调用
+    """
+
+    def __init__(self, rate=20, capacity=40):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, reserve=0.0, timeout=0.0):
+        """取一个令牌，timeout秒内取不到时返回False（预计等不到时立即返回）"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens - 1 >= reserve:
+                    self.tokens -= 1
+                    return True
+                wait_time = (reserve + 1 - self.tokens) / self.rate
+                if now + wait_time > deadline:
+                    return False
+                self._cond.wait(wait_time)
+
+    def available(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return self.tokens
@@ -0,0 +1,154 @@
+import re
+import threading
+import time
+from collections import deque
+
+_COMMENT_RE = re.compile(r'(?:#|--)[^\n]*|/\*.*?\*/', re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_VALUE_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL指纹：把字面量和占位符替换为?，去掉注释，IN列表/VALUES列表合并为(?+)，统一大小写和空白
+
+    参数不同但结构相同的语句得到相同的指纹，如
+    SELECT * FROM user WHERE id = 1 与 SELECT * FROM user WHERE id = %s -> select * from user where id = ?
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _VALUE_LIST_RE.sub('(?+)', sql)
+    return _SPACE_RE.sub(' ', sql).strip().lower()
+
+
+class SqlStats(object):
+    """SQL执行统计（线程安全）
+
+    - 按指纹汇总执行次数、耗时、影响/返回行数和错误数
+    - 超过slow_threshold秒的语句记入慢查询日志（保留最近slow_log_size条）
+    - 按请求端点汇总每次请求的查询数和耗时，同一请求内同一指纹执行超过repeat_threshold次视为N+1
+    """
+
+    def __init__(self, slow_threshold=0.2, repeat_threshold=10, slow_log_size=100, max_fingerprints=1000):
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._endpoints = {}
+        self._slow_log = deque(maxlen=slow_log_size)
+        self._n_plus_one = deque(maxlen=slow_log_size)
+        self._routes = {}
+        self.dropped = 0
+
+    def record(self, key, sql, elapsed, rows, error=False):
+        """记录一条语句的执行结果，返回是否为慢查询"""
+        slow = elapsed >= self.slow_threshold
+        with self._lock:
+            item = self._fingerprints.get(key)
+            if item is None:
+                if len(self._fingerprints) >= self.max_fingerprints:
+                    self.dropped += 1
+                else:
+                    item = self._fingerprints[key] = {
+                        'count': 0, 'total_time': 0.0, 'max_time': 0.0, 'rows': 0, 'errors': 0, 'slow': 0
+                    }
+            if item is not None:
+                item['count'] += 1
+                item['total_time'] += elapsed
+                item['max_time'] = max(item['max_time'], elapsed)
+                item['rows'] += rows or 0
+                item['errors'] += 1 if error else 0
+                item['slow'] += 1 if slow else 0
+            if slow:
+                self._slow_log.append({
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'fingerprint': key,
+                    'sql': sql[:1000],
+                    'elapsed_ms': round(elapsed * 1000, 1),
+                    'rows': rows
+                })
+        return slow
+
+    def record_request(self, endpoint, queries):
+        """汇总一次请求执行的语句
+
+        Args:
+            endpoint: 请求端点
+            queries: [(指纹, 耗时秒数)]
+
+        Returns:
+            执行次数超过repeat_threshold的[(指纹, 次数)]
+        """
+        counts = {}
+        total_time = 0.0
+        for key, elapsed in queries:
+            counts[key] = counts.get(key, 0) + 1
+            total_time += elapsed
+        repeated = [(key, count) for key, count in counts.items() if count > self.repeat_threshold]
+        with self._lock:
+            item = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'total_time': 0.0, 'max_queries': 0, 'n_plus_one': 0
+            })
+            item['requests'] += 1
+            item['queries'] += len(queries)
+            item['total_time'] += total_time
+            item['max_queries'] = max(item['max_queries'], len(queries))
+            if repeated:
+                item['n_plus_one'] += 1
+                for key, count in repeated:
+                    self._n_plus_one.append({
+                        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                        'endpoint': endpoint,
+                        'fingerprint': key,
+                        'count': count
+                    })
+        return repeated
+
+    def record_route(self, target):
+        """记录一次语句路由（primary、replica、replica_fallback）"""
+        with self._lock:
+            self._routes[target] = self._routes.get(target, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._fingerprints.clear()
+            self._endpoints.clear()
+            self._slow_log.clear()
+            self._n_plus_one.clear()
+            self._routes.clear()
+            self.dropped = 0
+
+    def stats(self, top=20):
+        with self._lock:
+            fingerprints = [dict(item, fingerprint=key) for key, item in self._fingerprints.items()]
+            endpoints = [dict(item, endpoint=key) for key, item in self._endpoints.items()]
+            slow_log = list(self._slow_log)
+            n_plus_one = list(self._n_plus_one)
+            routes = dict(self._routes)
+            dropped = self.dropped
+        for item in fingerprints:
+            item['avg_ms'] = round(item['total_time'] / item['count'] * 1000, 2)
+            item['max_ms'] = round(item.pop('max_time') * 1000, 2)
+            item['total_ms'] = round(item.pop('total_time') * 1000, 1)
+        for item in endpoints:
+            item['avg_queries'] = round(item['queries'] / item['requests'], 2)
+            item['avg_ms'] = round(item['total_time'] / item['requests'] * 1000, 2)
+            item['total_ms'] = round(item.pop('total_time') * 1000, 1)
+        fingerprints.sort(key=lambda item: item['total_ms'], reverse=True)
+        endpoints.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {
+            'slow_threshold_ms': round(self.slow_threshold * 1000, 1),
+            'repeat_threshold': self.repeat_threshold,
+            'fingerprints': fingerprints[:top],
+            'fingerprint_count': len(fingerprints),
+            'dropped': dropped,
+            'routes': routes,
+            'endpoints': endpoints[:top],
+            'slow_queries': slow_log[::-1],
+            'n_plus_one': n_plus_one[::-1]
+        }
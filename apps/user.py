@@ -2,7 +2,7 @@ from flask import Blueprint, request, redirect, url_for, session, jsonify, curre
 from apps.tool.Mysql import Mysql
 import hashlib
 from functools import wraps
-from apps.music import get_songs_detail
+from apps.song_catalog import resolve_song_infos
 import re
 
 
@@ -345,37 +345,26 @@ def get_playlist_detail(playlist_id):
             if not (isinstance(playlist, list) and playlist):
                 return jsonify({'message': '歌单不存在或无权访问'}), 404
             
-            # 获取歌单中的歌曲
+            # 获取歌单中的歌曲（关联本地歌曲表补全歌曲信息）
             songs = mysql.sql(
                 """
-                SELECT ps.song_id, ps.add_time
+                SELECT ps.song_id, ps.add_time, s.name, s.artists, s.album, s.cover_url, s.last_refreshed
                 FROM playlist_song ps
+                LEFT JOIN song s ON s.id = ps.song_id
                 WHERE ps.playlist_id = %s
                 ORDER BY ps.add_time DESC
                 """,
                 [playlist_id]
             )
             
-            # 批量获取歌曲详情（优化性能）
+            # 补全歌曲详情（本地歌曲表中没有的歌曲才请求上游）
             enriched_songs = []
             try:
                 # 如果没有歌曲，直接返回空列表
                 if not songs:
                     enriched_songs = []
                 else:
-                    # 提取所有歌曲ID
-                    song_ids = [song_info['song_id'] for song_info in songs]
-                    # 一次性请求所有歌曲详情
-                    all_song_details = {}
-                    
-                    # 直接使用所有song_ids请求歌曲详情
-                    batch_result = get_songs_detail(song_ids)
-                    
-                    if batch_result.get('code') == 200 and batch_result.get('songs'):
-                        # 将结果存入字典，以song_id为key
-                        for song in batch_result['songs']:
-                            if song:
-                                all_song_details[song.get('id')] = song
+                    all_song_details = resolve_song_infos(songs)
                     
                     # 构建返回结果，保持原有顺序
                     for song_info in songs:
@@ -388,10 +377,10 @@ def get_playlist_detail(playlist_id):
                             enriched_song = {
                                 'song_id': song_id,
                                 'add_time': song_info['add_time'],
-                                'name': song.get('name', '未知歌曲'),
-                                'artist': '/'.join([ar.get('name', '') for ar in song.get('ar', []) if ar.get('name')]),
-                                'cover_url': song.get('al', {}).get('picUrl', ''),
-                                'album': song.get('al', {}).get('name', '未知专辑')
+                                'name': song['name'],
+                                'artist': song['artist'],
+                                'cover_url': song['cover_url'],
+                                'album': song['album']
                             }
                         else:
                             # 没有详情时使用基本信息
@@ -485,19 +474,19 @@ def add_song_to_playlist(playlist_id):
             if isinstance(existing, list) and existing:
                 return jsonify({'message': '歌曲已在歌单中'}), 400
             
-            # 添加歌曲到歌单
-            result = mysql.sql(
-                "INSERT INTO playlist_song (playlist_id, song_id) VALUES (%s, %s)",
-                [playlist_id, song_id]
-            )
-            
-            if isinstance(result, tuple) and result[0] is not None and result[0] > 0:
-                # 更新歌单的更新时间
-                mysql.sql(
-                    "UPDATE playlist SET update_time = CURRENT_TIMESTAMP WHERE id = %s",
-                    [playlist_id]
+            # 添加歌曲并更新歌单的更新时间（同一事务，一次提交）
+            with mysql.transaction():
+                result = mysql.sql(
+                    "INSERT INTO playlist_song (playlist_id, song_id) VALUES (%s, %s)",
+                    [playlist_id, song_id]
                 )
-                
+                if isinstance(result, tuple) and result[0] is not None and result[0] > 0:
+                    mysql.sql(
+                        "UPDATE playlist SET update_time = CURRENT_TIMESTAMP WHERE id = %s",
+                        [playlist_id]
+                    )
+
+            if isinstance(result, tuple) and result[0] is not None and result[0] > 0:
                 current_app.logger.info(f"用户 {user_id} 添加歌曲 {song_id} 到歌单 {playlist_id} 成功")
                 return jsonify({'message': '歌曲添加成功'}), 200
             else:
@@ -507,6 +496,70 @@ def add_song_to_playlist(playlist_id):
         current_app.logger.error(f"添加歌曲到歌单错误: {str(e)}")
         return jsonify({'message': '系统错误，请稍后重试'}), 500
 
+# 批量添加歌曲到歌单接口
+@user.route('/playlist/<int:playlist_id>/add_songs', methods=['POST'])
+@login_required
+def add_songs_to_playlist(playlist_id):
+    """
+    批量添加歌曲到歌单（已在歌单中的歌曲会被跳过）
+    POST参数: song_ids (歌曲ID列表，单次最多1000首)
+    """
+    try:
+        user_id = session.get('user_id')
+        data = request.json or {}
+
+        song_ids = data.get('song_ids')
+        if not isinstance(song_ids, list) or not song_ids:
+            return jsonify({'message': '歌曲ID列表不能为空'}), 400
+        if len(song_ids) > 1000:
+            return jsonify({'message': '单次最多添加1000首歌曲'}), 400
+
+        try:
+            song_ids = list(dict.fromkeys(int(song_id) for song_id in song_ids))
+        except (TypeError, ValueError):
+            return jsonify({'message': '歌曲ID格式错误'}), 400
+        if any(song_id < -9223372036854775808 or song_id > 9223372036854775807 for song_id in song_ids):
+            return jsonify({'message': '歌曲ID超出有效范围'}), 400
+
+        with Mysql() as mysql:
+            if session.get('is_admin', 0):
+                playlist = mysql.sql(
+                    "SELECT id FROM playlist WHERE id = %s AND deleted=0",
+                    [playlist_id]
+                )
+            else:
+                playlist = mysql.sql(
+                    "SELECT id FROM playlist WHERE id = %s AND user_id = %s AND deleted=0",
+                    [playlist_id, user_id]
+                )
+
+            if not (isinstance(playlist, list) and playlist):
+                return jsonify({'message': '歌单不存在或无权访问'}), 404
+
+            # 多行INSERT写入，歌单中已有的歌曲由唯一索引跳过；与更新时间在同一事务中提交
+            with mysql.transaction():
+                counts = mysql.update_many(
+                    "INSERT IGNORE INTO playlist_song (playlist_id, song_id) VALUES (%s, %s)",
+                    [(playlist_id, song_id) for song_id in song_ids]
+                )
+                added = sum(counts)
+                if added > 0:
+                    mysql.sql(
+                        "UPDATE playlist SET update_time = CURRENT_TIMESTAMP WHERE id = %s",
+                        [playlist_id]
+                    )
+
+            current_app.logger.info(f"用户 {user_id} 批量添加 {added} 首歌曲到歌单 {playlist_id}")
+            return jsonify({
+                'message': '歌曲添加成功',
+                'added': added,
+                'skipped': len(song_ids) - added
+            }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"批量添加歌曲到歌单错误: {str(e)}")
+        return jsonify({'message': '系统错误，请稍后重试'}), 500
+
 # 删除歌单中的歌曲接口
 @user.route('/playlist/<int:playlist_id>/remove_song/<int:song_id>', methods=['DELETE'])
 @login_required
@@ -818,10 +871,11 @@ def get_play_history():
             # 获取分页数据
             history_list = mysql.sql(
                 """
-                SELECT song_id, play_time 
-                FROM play_history 
-                WHERE user_id = %s 
-                ORDER BY play_time DESC 
+                SELECT ph.song_id, ph.play_time, s.name, s.artists, s.album, s.cover_url, s.last_refreshed
+                FROM play_history ph
+                LEFT JOIN song s ON s.id = ph.song_id
+                WHERE ph.user_id = %s 
+                ORDER BY ph.play_time DESC 
                 LIMIT %s OFFSET %s
                 """,
                 [user_id, page_size, offset]
@@ -837,25 +891,11 @@ def get_play_history():
             # 转换为列表
             unique_history = list(unique_songs.values())
             
-            # 批量获取歌曲详情
-            song_ids = [record['song_id'] for record in unique_history]
+            # 补全歌曲详情（本地歌曲表中没有的歌曲才请求上游）
             enriched_history = []
             
             try:
-                # 使用批量获取歌曲详情的方式，减少API调用次数
-                # 每50首歌一批进行处理
-                song_details_map = {}
-                for i in range(0, len(song_ids), 50):
-                    batch_ids = song_ids[i:i+50]
-                    
-                    # 使用批量获取函数
-                    batch_result = get_songs_detail(batch_ids)
-                    
-                    # 处理批量结果
-                    if batch_result and batch_result.get('code') == 200 and 'songs' in batch_result:
-                        for song in batch_result['songs']:
-                            if song and 'id' in song:
-                                song_details_map[song['id']] = song
+                song_details_map = resolve_song_infos(unique_history)
                 
                 # 构建丰富的历史记录列表
                 for record in unique_history:
@@ -867,10 +907,10 @@ def get_play_history():
                             enriched_record = {
                                 'song_id': song_id,
                                 'play_time': record['play_time'],
-                                'name': song.get('name', '未知歌曲'),
-                                'artist': '/'.join([ar.get('name', '') for ar in song.get('ar', []) if ar.get('name')]),
-                                'cover_url': song.get('al', {}).get('picUrl', ''),
-                                'album': song.get('al', {}).get('name', '未知专辑')
+                                'name': song['name'],
+                                'artist': song['artist'],
+                                'cover_url': song['cover_url'],
+                                'album': song['album']
                             }
                             enriched_history.append(enriched_record)
                         else:
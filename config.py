@@ -27,6 +27,16 @@ class Config:
     DB_PASSWORD = os.environ.get('DB_PASSWORD', '123456')
     DB_NAME = os.environ.get('DB_NAME', 'music')
     DB_PORT = int(os.environ.get('DB_PORT', 3306))
+    # 只读副本配置（DB_REPLICA_HOST为空时不启用，查询全部发往主库；其余项为空时沿用主库配置）
+    DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST', '')
+    DB_REPLICA_PORT = int(os.environ.get('DB_REPLICA_PORT', 0) or 0)
+    DB_REPLICA_USER = os.environ.get('DB_REPLICA_USER', '')
+    DB_REPLICA_PASSWORD = os.environ.get('DB_REPLICA_PASSWORD', '')
+    DB_REPLICA_CONNECT_TIMEOUT = int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 2))  # 只读副本连接超时（秒）
+    DB_REPLICA_RETRY_SECONDS = int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))  # 只读副本连接失败后，该时间内查询直接发往主库
+    DB_STREAM_WRITE_TIMEOUT = int(os.environ.get('DB_STREAM_WRITE_TIMEOUT', 3600))  # 流式查询连接的net_write_timeout（秒），允许逐批处理时长时间不读取
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 200))  # 慢查询阈值（毫秒），超过时记录日志
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 10))  # 同一请求内同一SQL指纹执行超过该次数时视为N+1查询并告警
     
     # 网易云音乐API配置
     NETEASE_MUSIC_AES_KEY = os.environ.get('NETEASE_MUSIC_AES_KEY', 'e82ckenh8dichen8').encode()
@@ -34,6 +44,57 @@ class Config:
     NETEASE_MUSIC_COOKIE = os.environ.get('NETEASE_MUSIC_COOKIE', '')
     # 默认音质配置
     DEFAULT_MUSIC_QUALITY = os.environ.get('DEFAULT_MUSIC_QUALITY', 'standard')
+    # 歌曲详情缓存配置
+    SONG_DETAIL_CACHE_SIZE = int(os.environ.get('SONG_DETAIL_CACHE_SIZE', 5000))  # 最多缓存的歌曲数
+    SONG_DETAIL_CACHE_TTL = int(os.environ.get('SONG_DETAIL_CACHE_TTL', 3600))  # 缓存有效期（秒）
+    # 播放URL缓存配置
+    SONG_URL_CACHE_SIZE = int(os.environ.get('SONG_URL_CACHE_SIZE', 5000))  # 最多缓存的(歌曲, 音质)组合数
+    SONG_URL_EXPIRY_MARGIN = int(os.environ.get('SONG_URL_EXPIRY_MARGIN', 60))  # 比上游URL提前失效的秒数
+    # 否定结果缓存配置（无播放地址、无歌词、歌曲不存在）
+    NEGATIVE_CACHE_SIZE = int(os.environ.get('NEGATIVE_CACHE_SIZE', 10000))  # 否定结果缓存最大条目数
+    NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 300))  # 否定结果缓存时间（秒）
+    # 本地歌词存储配置
+    LYRIC_STORE_PATH = os.environ.get('LYRIC_STORE_PATH', 'data/lyrics.db')  # SQLite文件路径，建议放在部署目录之外
+    LYRIC_STORE_MAX_BYTES = int(os.environ.get('LYRIC_STORE_MAX_BYTES', 1024 * 1024 * 200))  # 压缩后歌词总大小上限，默认200MB
+    # 搜索结果缓存配置
+    SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', 2000))  # 搜索结果缓存最大条目数
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 120))  # 搜索结果缓存过期时间（秒）
+    # 网易云用户歌单配置
+    USER_PLAYLIST_CACHE_SIZE = int(os.environ.get('USER_PLAYLIST_CACHE_SIZE', 1000))  # 最多缓存的用户数
+    USER_PLAYLIST_CACHE_TTL = int(os.environ.get('USER_PLAYLIST_CACHE_TTL', 300))  # 用户歌单缓存时间（秒）
+    USER_PLAYLIST_PAGE_CONCURRENCY = int(os.environ.get('USER_PLAYLIST_PAGE_CONCURRENCY', 4))  # 第一页之后每轮并发请求的页数
+    # 热门歌单与排行榜快照配置
+    SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', 600))  # 后台刷新间隔（秒）
+    CHART_PLAYLIST_IDS = [int(sid.strip()) for sid in os.environ.get('CHART_PLAYLIST_IDS', '3778678,19723756,3779629,2884035').split(',') if sid.strip()]  # 排行榜歌单ID
+    # 本地歌曲表配置
+    SONG_CATALOG_TTL = int(os.environ.get('SONG_CATALOG_TTL', 7 * 24 * 3600))  # 本地歌曲信息过期时间（秒），过期后在后台刷新
+    SONG_REFRESH_INTERVAL = int(os.environ.get('SONG_REFRESH_INTERVAL', 3600))  # 同一首歌曲两次后台刷新的最小间隔（秒）
+    # 上游HTTP客户端配置
+    UPSTREAM_POOL_CONNECTIONS = int(os.environ.get('UPSTREAM_POOL_CONNECTIONS', 10))  # 缓存的主机连接池数量
+    UPSTREAM_POOL_MAXSIZE = int(os.environ.get('UPSTREAM_POOL_MAXSIZE', 50))  # 每个主机保持的最大连接数
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3))  # 连接超时（秒）
+    UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))  # 默认读取超时（秒）
+    UPSTREAM_DNS_CACHE_TTL = int(os.environ.get('UPSTREAM_DNS_CACHE_TTL', 60))  # 上游客户端DNS解析结果缓存时间（秒）
+    UPSTREAM_BREAKER_ERROR_RATE = float(os.environ.get('UPSTREAM_BREAKER_ERROR_RATE', 0.5))  # 触发熔断的失败率
+    UPSTREAM_BREAKER_MIN_REQUESTS = int(os.environ.get('UPSTREAM_BREAKER_MIN_REQUESTS', 10))  # 计算失败率所需的最少请求数
+    UPSTREAM_BREAKER_OPEN_SECONDS = float(os.environ.get('UPSTREAM_BREAKER_OPEN_SECONDS', 30))  # 熔断持续时间（秒），之后放行一个探测请求
+    UPSTREAM_BREAKER_WINDOW = int(os.environ.get('UPSTREAM_BREAKER_WINDOW', 50))  # 统计失败率和耗时的最近请求数
+    UPSTREAM_ADAPTIVE_TIMEOUT_FACTOR = float(os.environ.get('UPSTREAM_ADAPTIVE_TIMEOUT_FACTOR', 3))  # 自适应读取超时 = p99耗时 × 该倍数
+    UPSTREAM_ADAPTIVE_TIMEOUT_MIN = float(os.environ.get('UPSTREAM_ADAPTIVE_TIMEOUT_MIN', 2))  # 自适应读取超时的最小值（秒）
+    UPSTREAM_HEDGE_ENABLED = os.environ.get('UPSTREAM_HEDGE_ENABLED', 'True').lower() in ('true', '1', 't')  # 是否对幂等读请求启用对冲
+    UPSTREAM_HEDGE_PERCENTILE = float(os.environ.get('UPSTREAM_HEDGE_PERCENTILE', 95))  # 超过最近耗时的该百分位仍未返回时发出对冲请求
+    UPSTREAM_HEDGE_BUDGET = float(os.environ.get('UPSTREAM_HEDGE_BUDGET', 0.05))  # 对冲请求数量上限占请求数的比例
+    UPSTREAM_HEDGE_WORKERS = int(os.environ.get('UPSTREAM_HEDGE_WORKERS', 32))  # 执行可对冲请求（第一次请求和对冲请求）的线程数
+    UPSTREAM_RATE_PER_SECOND = float(os.environ.get('UPSTREAM_RATE_PER_SECOND', 20))  # 每个上游接口每秒补充的请求令牌数
+    UPSTREAM_RATE_BURST = int(os.environ.get('UPSTREAM_RATE_BURST', 40))  # 每个上游接口允许的突发请求数
+    UPSTREAM_EXECUTOR_WORKERS = int(os.environ.get('UPSTREAM_EXECUTOR_WORKERS', 16))  # 并发上游请求的线程数上限
+    UPSTREAM_BACKGROUND_WORKERS = int(os.environ.get('UPSTREAM_BACKGROUND_WORKERS', 4))  # 预取、后台刷新等后台上游任务的线程数
+    PARSE_DEADLINE = float(os.environ.get('PARSE_DEADLINE', 12))  # 解析接口(/music/jx)的整体超时时间（秒）
+    SONG_DETAIL_CHUNK_SIZE = int(os.environ.get('SONG_DETAIL_CHUNK_SIZE', 200))  # 大批量获取歌曲详情时每次上游请求的歌曲数
+    ASYNC_UPSTREAM_CONCURRENCY = int(os.environ.get('ASYNC_UPSTREAM_CONCURRENCY', 20))  # asyncio客户端同时进行的上游请求数上限
+    PREFETCH_MAX_IDS = int(os.environ.get('PREFETCH_MAX_IDS', 10))  # 预取接口单次最多预取的歌曲数
+    PREFETCH_MAX_PENDING = int(os.environ.get('PREFETCH_MAX_PENDING', 32))  # 后台任务积压超过该数量时不再接受预取
+    BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS', 100))  # 批量歌曲信息接口单次最多查询的歌曲数
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')
@@ -71,4 +71,18 @@ CREATE INDEX idx_playlist_song_playlist_id
     ON playlist_song (playlist_id);
 
 CREATE INDEX idx_playlist_song_song_id
-    ON playlist_song (song_id);
\ No newline at end of file
+    ON playlist_song (song_id);
+
+-- 歌曲信息表（网易云歌曲元数据的本地缓存）
+-- 已有数据库升级时可单独执行本段（应用启动时也会自动创建）
+CREATE TABLE IF NOT EXISTS song (
+    id             BIGINT                             NOT NULL
+        PRIMARY KEY,
+    name           VARCHAR(255)                       NOT NULL,
+    artists        VARCHAR(500)                       NULL,
+    album          VARCHAR(255)                       NULL,
+    cover_url      VARCHAR(500)                       NULL,
+    duration       INT                                NULL,
+    last_refreshed DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    INDEX idx_song_last_refreshed (last_refreshed)
+);
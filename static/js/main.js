@@ -594,43 +594,34 @@ document.addEventListener('DOMContentLoaded', () => {
                     // 更新歌手信息
                     songArtistEl.textContent = (track.artists || []).map(a => a.name).join(' / ');
 
-                    // 获取歌曲封面
-                    fetch(`/music/song/cover/${track.id}`)
+                    // 一次请求同时获取歌曲封面和歌词
+                    fetch(`/music/song/batch?ids=${track.id}&fields=cover,lyric`)
                         .then(res => res.json())
-                        .then(coverData => {
+                        .then(batchData => {
+                            const info = batchData.code === 200 && batchData.data ? batchData.data[String(track.id)] : null;
                             // 如果获取封面成功
-                            if (coverData.code === 200) {
-                                albumArtEl.src = coverData.data.picUrl;
+                            if (info && info.cover) {
+                                albumArtEl.src = info.cover;
                             } else {
                                 // 使用默认封面
                                 albumArtEl.src = 'https://picsum.photos/56/56?random=1';
                             }
-                        })
-                        .catch(() => {
-                            // 出错时使用默认封面
-                            albumArtEl.src = 'https://picsum.photos/56/56?random=1';
-                        });
-
-                    // 获取歌曲歌词
-                    fetch(`/music/song/lyric/${track.id}`)
-                        .then(r => r.json())
-                        .then(ld => {
                             // 如果获取歌词成功
-                            if (ld.code === 200 && ld.data) {
+                            if (info && info.lyric) {
                                 // 解析歌词和翻译歌词
-                                lyrics = parseLRC(ld.data.lrc);
-                                tlyrics = parseLRC(ld.data.tlyric);
-                                // 渲染歌词
-                                renderLyrics();
+                                lyrics = parseLRC(info.lyric.lrc);
+                                tlyrics = parseLRC(info.lyric.tlyric);
                             } else {
                                 // 清空歌词
                                 lyrics = [];
                                 tlyrics = [];
-                                renderLyrics();
                             }
+                            // 渲染歌词
+                            renderLyrics();
                         })
                         .catch(() => {
-                            // 出错时清空歌词
+                            // 出错时使用默认封面并清空歌词
+                            albumArtEl.src = 'https://picsum.photos/56/56?random=1';
                             lyrics = [];
                             tlyrics = [];
                             renderLyrics();
@@ -641,6 +632,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     playPauseBtn.innerHTML = '<i class="fa-solid fa-pause"></i>';
                     // 更新正在播放指示器
                     updateNowPlayingIndicator(track.id);
+                    // 预取后续歌曲的播放URL
+                    prefetchUpcomingTracks(currentTrackIndex);
                 } else {
                     // 获取URL失败时播放下一首
     
@@ -654,6 +647,32 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     }
 
+    // 预取播放队列中接下来几首歌曲的播放URL，切歌时可直接命中服务端缓存
+    const PREFETCH_COUNT = 3;
+    function prefetchUpcomingTracks(trackIndex) {
+        const playlist = window.currentPlaylist || [];
+        if (playlist.length <= 1) {
+            return;
+        }
+        const ids = [];
+        for (let i = 1; i <= Math.min(PREFETCH_COUNT, playlist.length - 1); i++) {
+            const next = playlist[(trackIndex + i) % playlist.length];
+            if (next && next.id) {
+                ids.push(next.id);
+            }
+        }
+        if (ids.length === 0) {
+            return;
+        }
+        fetch('/music/song/prefetch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids: ids.join(',') })
+        }).catch(() => {
+            // 预取失败不影响播放
+        });
+    }
+
     // 添加防抖变量
     let playTrackDebounceTimer = null;
     
@@ -799,8 +818,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // 搜索音乐函数
     async function searchMusic(query) {
         try {
-            // 发起搜索请求
-            const response = await fetch(`/music/search?name=${encodeURIComponent(query)}&page=0`);
+            // 发起搜索请求（只取渲染和播放需要的字段）
+            const fields = 'result.songs.id,result.songs.name,result.songs.artists,result.songs.duration,result.songs.album';
+            const response = await fetch(`/music/search?name=${encodeURIComponent(query)}&page=0&fields=${fields}`);
             const data = await response.json();
             // 如果搜索成功
             if (data.code === 200 && data.result && data.result.songs) {
@@ -857,7 +877,7 @@ document.addEventListener('DOMContentLoaded', () => {
     async function loadPlaylist(playlistId) {
         try {
             // 发起获取歌单请求
-            const response = await fetch(`/music/playlist/${playlistId}`);
+            const response = await fetch(`/music/playlist/${playlistId}?full=1`);
             const data = await response.json();
 
             // 如果获取成功